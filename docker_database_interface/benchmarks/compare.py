@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Diff two benchmarks/routes.py result files, e.g. from the commits before and after
+a change. Prints p50/p95/p99 latency and throughput per scenario and concurrency
+level with the relative change, and exits with status 1 when any level got slower
+than --threshold percent (p95 up or throughput down) so it can gate CI:
+
+    python benchmarks/compare.py results/base.json results/head.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+METRICS = (("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("throughput_rps", True))
+
+
+def change(base, head):
+    if not base or head is None:
+        return None
+    return 100.0 * (head - base) / base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    print(f"base {base['meta'].get('commit')}  head {head['meta'].get('commit')}")
+    if base["meta"].get("dataset") != head["meta"].get("dataset"):
+        print(f"warning: datasets differ: {base['meta'].get('dataset')} vs {head['meta'].get('dataset')}")
+
+    print(f"{'scenario':<18} {'c':>4} " + " ".join(f"{name:>30}" for name, _ in METRICS))
+    regressions = []
+    for scenario, levels in head["results"].items():
+        for concurrency, after in levels.items():
+            before = base["results"].get(scenario, {}).get(concurrency)
+            if before is None:
+                print(f"{scenario:<18} {concurrency:>4}  (not in base)")
+                continue
+            cells = []
+            for name, higher_is_better in METRICS:
+                delta = change(before.get(name), after.get(name))
+                if delta is None:
+                    cells.append(f"{'-':>30}")
+                    continue
+                cells.append(f"{before[name]:>9} → {after[name]:>9} {delta:+6.1f}%".rjust(30))
+                if name in ("p95_ms", "throughput_rps"):
+                    worse = -delta if higher_is_better else delta
+                    if worse > args.threshold:
+                        regressions.append(f"{scenario} c={concurrency} {name} {delta:+.1f}%")
+            if after.get("errors") and not before.get("errors"):
+                regressions.append(f"{scenario} c={concurrency} errors {after['errors']}")
+            print(f"{scenario:<18} {concurrency:>4} " + " ".join(cells))
+
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
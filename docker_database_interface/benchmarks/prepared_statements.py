@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Latency of the fixed CRUD/lookup statements sent as plain text versus as cached
+server-side prepared statements (PostgresMaster.execute(..., prepare=True)).
+
+Run against a database created by the server (so the schema is migrated):
+
+    python benchmarks/prepared_statements.py --host localhost --user admin \
+        --password password --database mydb --iterations 5000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+from app import PostgresMaster, HUMAN_PROFILE_QUERY  # noqa: E402
+
+QUERIES = {
+    "read_human": ("SELECT * FROM humans WHERE id = %s;", lambda ids, i: (ids[i % len(ids)],)),
+    "read_many": ("SELECT * FROM humans WHERE id = ANY(%s);", lambda ids, i: (ids[i % len(ids):][:20],)),
+    "human_profile": (HUMAN_PROFILE_QUERY, lambda ids, i: {
+        "human_id": ids[i % len(ids)], "documents_limit": None, "families_limit": None}),
+}
+
+
+def seed(master, count):
+    existing = [row['id'] for row in master.execute("SELECT id FROM humans ORDER BY id LIMIT %s;", (count,))]
+    for n in range(len(existing), count):
+        row = master.execute(
+            "INSERT INTO humans (name, birthday, birthplace, gender, culture) "
+            "VALUES (%s, '1900-01-01', 'Benchmark', 'x', 'x') RETURNING id;", (f"bench-{n}",))
+        existing.append(row[0]['id'])
+    return existing
+
+
+def measure(master, query, make_params, ids, iterations, prepare):
+    # Warm up so preparation (and the first plan) isn't part of the timing.
+    for i in range(10):
+        master.execute(query, make_params(ids, i), prepare=prepare)
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        master.execute(query, make_params(ids, i), prepare=prepare)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.mean(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p95_us": round(samples[int(len(samples) * 0.95)], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=1000, help="humans to make sure exist")
+    args = parser.parse_args()
+
+    with PostgresMaster(args.host, args.port, args.user, args.password, args.database) as master:
+        ids = seed(master, args.rows)
+        print(f"{'query':<15} {'mode':<9} {'mean_us':>9} {'p50_us':>9} {'p95_us':>9}")
+        for name, (query, make_params) in QUERIES.items():
+            results = {}
+            for mode, prepare in (("text", False), ("prepared", True)):
+                results[mode] = measure(master, query, make_params, ids, args.iterations, prepare)
+                r = results[mode]
+                print(f"{name:<15} {mode:<9} {r['mean_us']:>9} {r['p50_us']:>9} {r['p95_us']:>9}")
+            speedup = results["text"]["mean_us"] / results["prepared"]["mean_us"]
+            print(f"{name:<15} speedup   {speedup:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Latency percentiles and throughput of the interface service's routes, at fixed
+concurrency levels, written as JSON that benchmarks/compare.py can diff between
+commits.
+
+The harness creates (or reuses) a benchmark database on the given Postgres, seeds
+it with client/generate_data.py at --scale humans, starts the FastAPI app under
+uvicorn against it and drives every scenario with --requests requests per level:
+
+    python benchmarks/routes.py --host localhost --user admin --password password \
+        --scale 100000 --concurrency 1 8 32 --out results/$(git rev-parse --short HEAD).json
+
+Pass --base-url to measure an already running service instead of starting one.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(HERE, "..", "server")
+CLIENT_DIR = os.path.join(HERE, "..", "client")
+
+# client/ and server/ both have a session_manager module; the client's must win
+# for generate_data, and only the server provides the app package.
+sys.path.insert(0, CLIENT_DIR)
+sys.path.append(SERVER_DIR)
+
+import httpx  # noqa: E402
+
+from app import PostgresMaster, create_new_database, run_migrations  # noqa: E402
+from async_session_manager import create_async_transport  # noqa: E402
+import generate_data  # noqa: E402
+
+
+# ---------------------------
+# Scenarios
+# ---------------------------
+# Each scenario turns a request number into (method, path, httpx kwargs). The
+# context holds the session, the seeded id range and state shared between
+# scenarios (humans created by create_human are removed again by delete_human).
+def create_human(ctx, rng, n):
+    return "POST", "/human/session", {"json": {
+        "name": f"Bench Human {ctx.token}-{next(ctx.counter)}", "birthday": "1950-01-01",
+        "birthplace": "Benchmark", "gender": "female", "culture": "Benchmark",
+        "biography": None, "comments": None
+    }}
+
+
+def read_human(ctx, rng, n):
+    return "GET", f"/human/session/{rng.randint(ctx.min_id, ctx.max_id)}", {}
+
+
+def read_many_humans(ctx, rng, n):
+    start = rng.randint(ctx.min_id, max(ctx.min_id, ctx.max_id - 20))
+    return "GET", "/human/session", {"params": {"ids": ",".join(str(i) for i in range(start, start + 20))}}
+
+
+def update_human(ctx, rng, n):
+    return "PUT", f"/human/session/{rng.randint(ctx.min_id, ctx.max_id)}", {"json": {"comments": f"bench {n}"}}
+
+
+def delete_human(ctx, rng, n):
+    # Removes what create_human added; should a create have failed, a negative id deletes nothing.
+    human_id = ctx.created.popleft() if ctx.created else -(n + 1)
+    return "DELETE", f"/human/session/{human_id}", {}
+
+
+def bundle_shallow(ctx, rng, n):
+    return "GET", "/session/bundle", {"params": {"table_name": "humans", "offset": 0, "limit": 100}}
+
+
+def bundle_deep(ctx, rng, n):
+    offset = max(0, int(ctx.humans * 0.9))
+    return "GET", "/session/bundle", {"params": {"table_name": "humans", "offset": offset, "limit": 100}}
+
+
+def database_info(ctx, rng, n):
+    return "GET", "/database-info", {"params": {"mode": "exact"}}
+
+
+def create_database(ctx, rng, n):
+    name = f"bench_tmp_{ctx.token}_{next(ctx.counter)}"
+    ctx.databases.append(name)
+    return "POST", "/database/create", {"params": {"new_database": name}}
+
+
+def _record_created(ctx, response):
+    if response.status_code == 201:
+        ctx.created.append(response.json()["human_id"])
+
+
+# name -> (request builder, response hook, request cap per level or None)
+SCENARIOS = collections.OrderedDict([
+    ("create_human", (create_human, _record_created, None)),
+    ("read_human", (read_human, None, None)),
+    ("read_many_humans", (read_many_humans, None, None)),
+    ("update_human", (update_human, None, None)),
+    ("delete_human", (delete_human, None, None)),
+    ("bundle_shallow", (bundle_shallow, None, None)),
+    ("bundle_deep", (bundle_deep, None, None)),
+    ("database_info", (database_info, None, None)),
+    # Creating a database copies template1 and runs every migration; a handful is plenty.
+    ("create_database", (create_database, None, 10)),
+])
+
+
+class Context:
+    def __init__(self, session_id, min_id, max_id, humans):
+        self.session_id = session_id
+        self.min_id = min_id
+        self.max_id = max_id
+        self.humans = humans
+        self.token = format(int(time.time()), "x")
+        self.counter = itertools.count()
+        self.created = collections.deque()
+        self.databases = []
+
+
+def percentile(samples, fraction):
+    # Nearest-rank percentile of an already sorted list.
+    return samples[min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))]
+
+
+async def run_level(client, ctx, build, hook, requests, warmup, concurrency, rng):
+    """
+    Send warmup + requests requests with `concurrency` workers; only the latter are timed.
+    """
+    latencies = []
+    errors = collections.Counter()
+
+    async def worker(numbers, timed):
+        for n in numbers:
+            method, path, kwargs = build(ctx, rng, n)
+            kwargs["params"] = dict(kwargs.get("params", {}), session_id=ctx.session_id)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                if timed:
+                    errors[type(e).__name__] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if hook:
+                hook(ctx, response)
+            if not timed:
+                continue
+            if response.status_code >= 400:
+                errors[str(response.status_code)] += 1
+            else:
+                latencies.append(elapsed)
+
+    # Warm up first so connection setup and first-use caches stay out of the timing.
+    await worker(iter(range(warmup)), False)
+    numbers = iter(range(warmup, warmup + requests))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(numbers, True) for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    result = {"requests": requests, "ok": len(latencies), "errors": dict(errors),
+              "seconds": round(wall, 3), "throughput_rps": round(len(latencies) / wall, 1) if wall else None}
+    if latencies:
+        result.update({
+            "mean_ms": round(1000 * sum(latencies) / len(latencies), 3),
+            "p50_ms": round(1000 * percentile(latencies, 0.50), 3),
+            "p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+            "p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+            "max_ms": round(1000 * latencies[-1], 3),
+        })
+    return result
+
+
+async def run_scenarios(args, base_url, db_config, dataset):
+    results = collections.OrderedDict()
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as setup:
+        response = await setup.post("/session", json=db_config)
+        response.raise_for_status()
+        session_id = response.json()["session_id"]
+    ctx = Context(session_id, dataset["min_id"], dataset["max_id"], dataset["humans"])
+    try:
+        for name, (build, hook, cap) in SCENARIOS.items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            results[name] = collections.OrderedDict()
+            for concurrency in args.concurrency:
+                requests = min(args.requests, cap) if cap else args.requests
+                warmup = min(args.warmup, cap) if cap else args.warmup
+                rng = random.Random(f"{args.seed}:{name}:{concurrency}")
+                async with create_async_transport(pool_size=concurrency, timeout=(5, 120)) as client:
+                    client.base_url = base_url
+                    level = await run_level(client, ctx, build, hook, requests, warmup, concurrency, rng)
+                results[name][str(concurrency)] = level
+                print(f"{name:<18} c={concurrency:<4} p50 {level.get('p50_ms', '-'):>9} ms  "
+                      f"p95 {level.get('p95_ms', '-'):>9} ms  p99 {level.get('p99_ms', '-'):>9} ms  "
+                      f"{level['throughput_rps']:>9} req/s  errors {level['errors'] or 0}", file=sys.stderr)
+    finally:
+        async with httpx.AsyncClient(base_url=base_url) as teardown:
+            for human_id in ctx.created:
+                await teardown.delete(f"/human/session/{human_id}", params={"session_id": session_id})
+            await teardown.post("/session/close", params={"session_id": session_id})
+        if ctx.databases:
+            drop_databases(args, ctx.databases)
+    return results
+
+
+# ---------------------------
+# Database and server setup
+# ---------------------------
+def maintenance_master(args):
+    return PostgresMaster(args.host, args.port, args.user, args.password, args.maintenance_database)
+
+
+def drop_databases(args, names):
+    with maintenance_master(args) as master:
+        for name in names:
+            master.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE);")
+
+
+def prepare_database(args, db_config):
+    """
+    Create, migrate and seed the benchmark database unless it already holds data
+    (or --fresh is given). Returns the dataset's row counts and humans id range.
+    """
+    with maintenance_master(args) as master:
+        exists = master.execute("SELECT 1 FROM pg_database WHERE datname = %s;", (args.database,))
+        if exists and args.fresh:
+            master.execute(f"DROP DATABASE {args.database} WITH (FORCE);")
+            exists = None
+        if not exists:
+            create_new_database(master, args.database)
+
+    bench = PostgresMaster(args.host, args.port, args.user, args.password, args.database)
+    with bench:
+        run_migrations(bench, target=args.migrate_to)
+        seeded = bench.execute("SELECT EXISTS (SELECT 1 FROM humans) AS seeded;")[0]['seeded']
+
+    if not seeded:
+        with tempfile.TemporaryDirectory() as out:
+            seed_args = argparse.Namespace(humans=args.scale, seed=args.seed, out=out, format="csv", first_id=1,
+                                           do_import=False)
+            generate_data.write_files(seed_args)
+            # COPY the files straight in: seeding is setup, not part of what is measured.
+            with bench, bench.transaction() as conn, conn.cursor() as cur:
+                for table in generate_data.TABLES:
+                    with open(os.path.join(out, f"{table}.csv"), encoding="utf-8") as f:
+                        columns = f.readline().strip()
+                        cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv);", f)
+                cur.execute("SELECT setval(pg_get_serial_sequence('humans', 'id'), (SELECT MAX(id) FROM humans));")
+            with bench:
+                bench.execute("ANALYZE;")
+
+    with bench:
+        row = bench.execute(
+            "SELECT (SELECT COUNT(*) FROM humans) AS humans, (SELECT COUNT(*) FROM documents) AS documents, "
+            "(SELECT COUNT(*) FROM families) AS families, (SELECT MIN(id) FROM humans) AS min_id, "
+            "(SELECT MAX(id) FROM humans) AS max_id, current_setting('server_version') AS postgres;"
+        )[0]
+    return dict(row)
+
+
+def start_server(args):
+    env = dict(os.environ, DB_ENGINE=args.engine)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.app_port),
+         "--log-level", "warning"],
+        cwd=SERVER_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup.")
+        try:
+            if httpx.get(f"{base_url}/session/stats", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready within 30 seconds.")
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=HERE, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=HERE) != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", default="")
+    parser.add_argument("--maintenance-database", default="postgres")
+    parser.add_argument("--database", default="bench_routes", help="benchmark database (created if missing)")
+    parser.add_argument("--fresh", action="store_true", help="drop and re-seed the benchmark database")
+    parser.add_argument("--migrate-to", type=int, default=None, help="last migration to apply (default: all)")
+    parser.add_argument("--scale", type=int, default=10000, help="approximate humans to seed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), help="default: all")
+    parser.add_argument("--engine", choices=("sync", "async"), default=os.environ.get("DB_ENGINE", "sync"))
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--base-url", help="measure a running service instead of starting one")
+    parser.add_argument("--out", help="write the JSON results here instead of stdout")
+    args = parser.parse_args()
+    if args.scenarios and "delete_human" in args.scenarios and "create_human" not in args.scenarios:
+        parser.error("delete_human deletes the humans create_human adds; select both.")
+
+    db_config = {"host": args.host, "port": args.port, "user": args.user,
+                 "password": args.password, "database": args.database}
+    dataset = prepare_database(args, db_config)
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        process, base_url = start_server(args)
+    try:
+        results = asyncio.run(run_scenarios(args, base_url, db_config, dataset))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "engine": args.engine if process is not None else None,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "dataset": {key: dataset[key] for key in ("humans", "documents", "families")},
+            "postgres": dataset["postgres"],
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
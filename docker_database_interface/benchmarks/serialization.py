@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Cost of rendering bundle-sized responses and reading request payloads, comparing
+FastAPI's default path (jsonable_encoder + stdlib json, model.dict()) with the
+service's (FastJSONResponse on orjson, vars(model)). No database is needed.
+
+    python benchmarks/serialization.py --rows 100 1000 --repeat 200
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from main import HumanCreate  # noqa: E402
+from responses import FastJSONResponse, orjson  # noqa: E402
+
+
+def human_rows(count):
+    # Shaped like RealDictCursor rows of humans: dates and timestamps included.
+    discovered = datetime.datetime(2024, 5, 1, 12, 30, 15, 123456)
+    return [{
+        "id": n,
+        "name": f"Human {n}",
+        "birthday": datetime.date(1900, 1, 1) + datetime.timedelta(days=n % 36500),
+        "birthplace": "Amsterdam",
+        "gender": "f" if n % 2 else "m",
+        "culture": "Dutch",
+        "status": "missing",
+        "biography": "Sailor and cartographer. " * 4,
+        "comments": None,
+        "discovery": discovered + datetime.timedelta(seconds=n),
+    } for n in range(count)]
+
+
+def timed(function, repeat):
+    function()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    if orjson is None:
+        print("orjson is not installed; FastJSONResponse falls back to the stdlib encoder.")
+
+    print(f"{'case':<28} {'rows':>6} {'before_ms':>10} {'after_ms':>10} {'speedup':>8}")
+    for count in args.rows:
+        payload = {"bundle": {"bundle": human_rows(count)}}
+        before = timed(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat)
+        after = timed(lambda: FastJSONResponse(payload).body, args.repeat)
+        print(f"{'render bundle':<28} {count:>6} {before:>10.3f} {after:>10.3f} {before / after:>7.1f}x")
+
+        models = [HumanCreate(**{k: str(v) if isinstance(v, datetime.date) else v
+                                 for k, v in row.items() if k not in ("id", "discovery")})
+                  for row in human_rows(count)]
+        before = timed(lambda: [model.dict() for model in models], args.repeat)
+        after = timed(lambda: [vars(model) for model in models], args.repeat)
+        print(f"{'read bulk payload':<28} {count:>6} {before:>10.3f} {after:>10.3f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import asyncio
+
+from session_manager import POOL_SIZE, TIMEOUT, RETRIES, BACKOFF, IDEMPOTENT_METHODS
+
+try:
+    import httpx
+except ImportError:  # The async client is optional; the sync client only needs requests.
+    httpx = None
+
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+
+def _require_httpx():
+    if httpx is None:
+        raise RuntimeError("The async client requires 'httpx'.")
+
+
+def create_async_transport(pool_size=POOL_SIZE, timeout=TIMEOUT):
+    """
+    An httpx.AsyncClient with a keep-alive pool of pool_size connections.
+    """
+    _require_httpx()
+    connect, read = timeout
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(read, connect=connect)
+    )
+
+
+async def get_session(base_url, host, port, user, password, database, transport=None, timeout=TIMEOUT):
+    """
+    Helper coroutine to create a session and return the session_id.
+    """
+    payload = {
+        "host": host,
+        "port": port,
+        "user": user,
+        "password": password,
+        "database": database
+    }
+    if transport is None:
+        async with create_async_transport(timeout=timeout) as own_transport:
+            response = await own_transport.post(f"{base_url}/session", json=payload)
+    else:
+        response = await transport.post(f"{base_url}/session", json=payload)
+    if response.status_code == 200:
+        session_id = response.json().get("session_id")
+        print(f"Session created successfully: {session_id}")
+        return session_id
+    else:
+        raise Exception(f"Failed to create session: {response.text}")
+
+
+class AsyncDatabaseSession:
+    """
+    asyncio counterpart of DatabaseSession (same post/get/put/delete surface, awaited).
+    Use it with `async with`; the server session and the HTTP pool are closed on exit.
+    gather() runs many calls concurrently, at most `concurrency` (default: pool_size) at a time:
+
+        async with AsyncDatabaseSession(base_url, session_id) as db:
+            results = await db.gather(db.post("human/session", human) for human in humans)
+    """
+
+    def __init__(self, base_url, session_id, pool_size=POOL_SIZE, timeout=TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF, concurrency=None):
+        self.base_url = base_url
+        self.session_id = session_id
+        self.retries = retries
+        self.backoff = backoff
+        # More requests in flight than pooled connections would only queue inside httpx.
+        self.concurrency = concurrency or pool_size
+        self.transport = create_async_transport(pool_size, timeout)
+
+    async def __aenter__(self):
+        if not self.session_id:
+            raise ValueError("A valid session_id must be provided.")
+        print(f"Using session: {self.session_id}")
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        try:
+            await self.close_session()
+        finally:
+            await self.transport.aclose()
+
+    async def _request(self, method, endpoint, **kwargs):
+        """
+        Send one request, retrying like the sync client: failed connects for every
+        method, other transport errors and 502/503/504 for idempotent methods only.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        params = dict(kwargs.pop("params", None) or {}, session_id=self.session_id)
+        idempotent = method in IDEMPOTENT_METHODS
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = await self.transport.request(method, url, params=params, **kwargs)
+            except httpx.ConnectError:
+                if last:
+                    raise
+            except httpx.TransportError:
+                if last or not idempotent:
+                    raise
+            else:
+                if last or not idempotent or response.status_code not in RETRY_STATUSES:
+                    return response
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    async def close_session(self):
+        """
+        Close the existing session.
+        """
+        response = await self._request("POST", "session/close")
+        if response.status_code == 200:
+            print(f"Session {self.session_id} closed successfully.")
+        else:
+            print(f"Error closing session: {response.text}")
+        self.session_id = None
+
+    async def post(self, endpoint, data, params=None):
+        response = await self._request("POST", endpoint, json=data, params=params)
+        return response.json()
+
+    async def get(self, endpoint, params=None):
+        response = await self._request("GET", endpoint, params=params)
+        return response.json()
+
+    async def put(self, endpoint, data, params=None):
+        response = await self._request("PUT", endpoint, json=data, params=params)
+        return response.json()
+
+    async def delete(self, endpoint):
+        response = await self._request("DELETE", endpoint)
+        return response.json()
+
+    async def gather(self, calls, concurrency=None, return_exceptions=False):
+        """
+        Await every call (coroutines such as db.post(...)) with at most concurrency
+        of them in flight, returning their results in input order. With
+        return_exceptions=True a failed call yields its exception instead of
+        cancelling the rest.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def bounded(call):
+            async with semaphore:
+                return await call
+
+        return await asyncio.gather(*(bounded(call) for call in calls), return_exceptions=return_exceptions)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic humans/documents/families for scale testing.
+
+Data is generated household by household: parents, children, their documents and
+the family links between them (plus grandparents outside the dataset, linked by
+name only). The same --seed always yields the same rows, and every row respects
+the tables' UNIQUE constraints. Either load it through the API's bulk endpoints
+with --workers requests in flight:
+
+    python generate_data.py api --humans 1000000 --seed 7 --workers 16 --database mydb
+
+or write CSV/NDJSON files for the COPY import endpoint (humans carry explicit ids,
+so import them into an empty database, humans first), optionally importing them:
+
+    python generate_data.py files --humans 5000000 --seed 7 --out data/ [--import --database mydb]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from main import random_date
+from session_manager import DatabaseSession, get_session
+
+FIRST_NAMES = {
+    "male": [
+        "Adam", "Albert", "Alexander", "Anthony", "Arthur", "Benjamin", "Charles", "Christopher",
+        "Daniel", "David", "Edward", "Ernest", "Francis", "Frederick", "George", "Harold",
+        "Henry", "Hugh", "Isaac", "Jacob", "James", "John", "Joseph", "Leonard", "Louis",
+        "Martin", "Matthew", "Michael", "Nathan", "Nicholas", "Oliver", "Patrick", "Paul",
+        "Peter", "Philip", "Raymond", "Richard", "Robert", "Samuel", "Stephen", "Thomas",
+        "Victor", "Walter", "William"
+    ],
+    "female": [
+        "Ada", "Agnes", "Alice", "Anna", "Barbara", "Beatrice", "Catherine", "Charlotte",
+        "Clara", "Dorothy", "Edith", "Eleanor", "Elizabeth", "Emily", "Emma", "Esther",
+        "Florence", "Frances", "Grace", "Hannah", "Helen", "Irene", "Isabel", "Jane",
+        "Josephine", "Julia", "Laura", "Lillian", "Louise", "Lucy", "Margaret", "Maria",
+        "Martha", "Mary", "Nora", "Olivia", "Rose", "Ruth", "Sarah", "Sophia", "Susan",
+        "Theresa", "Violet", "Winifred"
+    ],
+}
+
+SURNAME_ROOTS = [
+    "Ash", "Black", "Brad", "Brook", "Clay", "Cole", "Crane", "Dal", "East", "Fair", "Fern",
+    "Glen", "Gold", "Green", "Hart", "Hay", "Hol", "Kings", "Lang", "Lind", "Marsh", "Mill",
+    "Moor", "North", "Oak", "Pem", "Red", "Rock", "Rose", "Shel", "Stan", "Stone", "Strat",
+    "Thorn", "Wal", "West", "White", "Wick", "Win", "Wood"
+]
+SURNAME_SUFFIXES = [
+    "", "brook", "by", "croft", "dale", "field", "ford", "gate", "ham", "hill", "hurst",
+    "land", "ley", "man", "more", "ridge", "shaw", "stead", "ton", "well", "wick", "wood",
+    "worth"
+]
+SURNAMES = [root + suffix for root in SURNAME_ROOTS for suffix in SURNAME_SUFFIXES]
+
+TOWNS = [
+    "Ashbury", "Belmont", "Bridgeport", "Cedar Falls", "Clearwater", "Crestview", "Dover",
+    "Eastwood", "Elmira", "Fairhaven", "Glenwood", "Greenville", "Hampton", "Harbor Point",
+    "Highland", "Kingsbridge", "Lakeside", "Linden", "Maplewood", "Marlow", "Millbrook",
+    "Newport", "Northfield", "Oakdale", "Pinecrest", "Riverton", "Rockport", "Salem",
+    "Springdale", "Stonebridge", "Summit", "Westbrook", "Whitfield", "Willow Creek", "Woodstock",
+    "Alderton", "Blackridge", "Brampton", "Carlisle", "Dunmore", "Elmwood", "Fairview",
+    "Foxborough", "Granton", "Hollybrook", "Ivydale", "Kenwood", "Larkspur", "Lindenhurst",
+    "Mapleton", "Meadowvale", "Norwood", "Oakridge", "Pembrook", "Quarry Hill", "Redcliff",
+    "Rosedale", "Sherwood", "Silverton", "Thornbury"
+]
+REGIONS = [
+    "Northern District", "Southern District", "Eastern District", "Western District",
+    "Central Province", "Coastal Province", "Highland Province", "Lowland Province",
+    "River County", "Lake County", "Forest County", "Valley County", "Hill County",
+    "Bay County", "Prairie County", "Mountain County", "Northern Shire", "Southern Shire",
+    "Eastern Shire", "Western Shire", "Upper Valley", "Lower Valley", "Greater Bay", "Old Frontier"
+]
+PLACES = [f"{town}, {region}" for town in TOWNS for region in REGIONS]
+
+CULTURES = ["American", "British", "Canadian", "Dutch", "French", "German", "Irish",
+            "Italian", "Polish", "Scandinavian", "Spanish"]
+IDENTIFIER_TYPES = ["Birth Certificate", "Passport", "National ID", "Census Record",
+                    "Baptism Record", "Marriage Certificate", "Military Record"]
+ARCHIVES = ["State Archive", "Civil Registry", "Parish Register", "National Library", "Family Papers"]
+
+# Every household gets its own (surname, birthplace) pair, and members of one
+# household have distinct first names, so (name, birthplace, birthday) never repeats.
+CAPACITY = len(SURNAMES) * len(PLACES)
+MEAN_HOUSEHOLD_SIZE = 4.0
+
+EARLIEST_BIRTH = datetime(1900, 1, 1)
+LATEST_PARENT_BIRTH = datetime(1985, 12, 31)
+# Fixed rather than today, so a seed yields the same rows whenever it is run.
+LATEST_BIRTH = datetime(2024, 12, 31)
+YEAR = timedelta(days=365)
+
+TABLES = ("humans", "documents", "families")
+HUMAN_FIELDS = ("name", "birthday", "birthplace", "gender", "culture", "status", "biography", "comments")
+DOCUMENT_FIELDS = ("related_human_id", "identifier_type", "source", "comments")
+FAMILY_FIELDS = ("related_human_id", "relation_type", "human_name", "human_id", "comments")
+
+
+def _stride(capacity):
+    # Multiplying by a number coprime with capacity permutes the slots, which
+    # scatters consecutive households over surnames and places.
+    stride = 2654435761
+    while math.gcd(stride, capacity) != 1:
+        stride += 2
+    return stride
+
+
+STRIDE = _stride(CAPACITY)
+
+
+def household(seed, index):
+    """
+    Generate household `index` of the dataset for `seed`. Returns (members, documents,
+    links): members are humans rows; documents and links point at members by their
+    position ("member", and "relative" for links to another member, None otherwise).
+    """
+    rng = random.Random(f"{seed}:{index}")
+    surname_slot, place_slot = divmod((index * STRIDE + seed) % CAPACITY, len(PLACES))
+    surname, birthplace = SURNAMES[surname_slot], PLACES[place_slot]
+    culture = rng.choice(CULTURES)
+    used = {"male": set(), "female": set()}
+
+    def first_name(gender):
+        name = rng.choice([n for n in FIRST_NAMES[gender] if n not in used[gender]])
+        used[gender].add(name)
+        return name
+
+    members = []
+    births = []
+
+    def add(gender, born):
+        members.append({
+            "name": f"{first_name(gender)} {surname}",
+            "birthday": born.date().isoformat(),
+            "birthplace": birthplace,
+            "gender": gender,
+            "culture": culture,
+            "status": "found" if rng.random() < 0.15 else "missing",
+            "biography": f"Born in {birthplace.split(',')[0]} to the {surname} family." if rng.random() < 0.6 else None,
+            "comments": None,
+        })
+        births.append(born)
+        return len(members) - 1
+
+    # Usually a couple; one household in ten has a single parent.
+    father_born = random_date(EARLIEST_BIRTH, LATEST_PARENT_BIRTH, rng)
+    mother_born = father_born + timedelta(days=rng.randint(-5 * 365, 3 * 365))
+    parents = []
+    single = rng.random() < 0.1
+    if not single or rng.random() < 0.5:
+        parents.append(add("male", father_born))
+    if not single or not parents:
+        parents.append(add("female", mother_born))
+
+    youngest_parent = max(births)
+    start, end = youngest_parent + 18 * YEAR, min(youngest_parent + 42 * YEAR, LATEST_BIRTH)
+    children = []
+    if start < end:
+        for _ in range(rng.choices(range(6), weights=[12, 22, 30, 20, 10, 6])[0]):
+            gender = rng.choice(("male", "female"))
+            children.append(add(gender, random_date(start, end, rng)))
+
+    documents = []
+    for position in range(len(members)):
+        for identifier_type in rng.sample(IDENTIFIER_TYPES, rng.randint(0, 3)):
+            documents.append({
+                "member": position,
+                "identifier_type": identifier_type,
+                "source": f"{birthplace.split(', ')[1]} {rng.choice(ARCHIVES)}",
+                "comments": "Verified document" if rng.random() < 0.3 else None,
+            })
+
+    links = []
+
+    def link(position, relation_type, relative=None, human_name=None):
+        links.append({
+            "member": position,
+            "relation_type": relation_type,
+            "human_name": human_name or members[relative]["name"],
+            "relative": relative,
+            "comments": None,
+        })
+
+    def by_gender(position, male, female):
+        return male if members[position]["gender"] == "male" else female
+
+    for child in children:
+        for parent in parents:
+            link(child, by_gender(parent, "Father", "Mother"), parent)
+        for sibling in children:
+            if sibling != child:
+                link(child, by_gender(sibling, "Brother", "Sister"), sibling)
+    for parent in parents:
+        for other in parents:
+            if other != parent:
+                link(parent, "Spouse", other)
+        for child in children:
+            link(parent, by_gender(child, "Son", "Daughter"), child)
+        # Grandparents are not in the dataset; they are linked by name only.
+        family_name = surname
+        while members[parent]["gender"] == "female" and family_name == surname:
+            family_name = rng.choice(SURNAMES)
+        link(parent, "Father", human_name=f"{rng.choice(FIRST_NAMES['male'])} {family_name}")
+        link(parent, "Mother", human_name=f"{rng.choice(FIRST_NAMES['female'])} {family_name}")
+    return members, documents, links
+
+
+def household_count(humans):
+    households = math.ceil(humans / MEAN_HOUSEHOLD_SIZE)
+    if households > CAPACITY:
+        raise ValueError(f"At most {CAPACITY} households (~{int(CAPACITY * MEAN_HOUSEHOLD_SIZE)} humans) "
+                         f"can be generated without repeating a (name, birthplace, birthday).")
+    return households
+
+
+def resolve(documents, links, ids):
+    """
+    Turn member positions into humans ids; rows whose human was rejected are dropped.
+    """
+    document_rows = [
+        {"related_human_id": ids[d["member"]], "identifier_type": d["identifier_type"],
+         "source": d["source"], "comments": d["comments"]}
+        for d in documents if ids[d["member"]] is not None
+    ]
+    family_rows = [
+        {"related_human_id": ids[f["member"]], "relation_type": f["relation_type"],
+         "human_name": f["human_name"],
+         "human_id": ids[f["relative"]] if f["relative"] is not None else None,
+         "comments": f["comments"]}
+        for f in links if ids[f["member"]] is not None
+    ]
+    return document_rows, family_rows
+
+
+def report(counts, elapsed):
+    total = sum(counts.values())
+    for table in TABLES:
+        print(f"{table:<10} {counts[table]:>10} rows {counts[table] / elapsed:>10.0f} rows/s")
+    print(f"{'total':<10} {total:>10} rows {total / elapsed:>10.0f} rows/s in {elapsed:.1f}s")
+
+
+# ---------------------------
+# Load through the API
+# ---------------------------
+async def load_chunk(db, seed, start, stop, batch_size, counts, errors):
+    humans, documents, links = [], [], []
+    for index in range(start, stop):
+        members, member_documents, member_links = household(seed, index)
+        base = len(humans)
+        humans.extend(members)
+        documents.extend(dict(d, member=d["member"] + base) for d in member_documents)
+        links.extend(dict(f, member=f["member"] + base,
+                          relative=None if f["relative"] is None else f["relative"] + base)
+                     for f in member_links)
+
+    # on_conflict=ignore hands back the ids of rows an earlier run already loaded,
+    # so an interrupted load can simply be run again with the same seed.
+    params = {"on_conflict": "ignore", "batch_size": batch_size}
+    result = await db.post("human/session/bulk", humans, params=params)
+    ids = result["human_ids"]
+    document_rows, family_rows = resolve(documents, links, ids)
+    results = await asyncio.gather(
+        db.post("document/session/bulk", document_rows, params=params),
+        db.post("family/session/bulk", family_rows, params=params)
+    )
+    for table, rows, response in zip(TABLES, (humans, document_rows, family_rows), [result] + results):
+        counts[table] += len(rows)
+        errors.extend(response["errors"][:5])
+
+
+async def load_api(args):
+    from async_session_manager import AsyncDatabaseSession, get_session as get_async_session
+
+    households = household_count(args.humans)
+    counts = {table: 0 for table in TABLES}
+    errors = []
+    session_id = await get_async_session(args.base_url, args.host, args.port, args.user,
+                                         args.password, args.database)
+    started = time.perf_counter()
+    async with AsyncDatabaseSession(args.base_url, session_id, pool_size=args.workers,
+                                    timeout=(5, 300)) as db:
+        await db.gather(
+            load_chunk(db, args.seed, start, min(start + args.chunk, households), args.batch_size, counts, errors)
+            for start in range(0, households, args.chunk)
+        )
+    report(counts, time.perf_counter() - started)
+    if errors:
+        print(f"Rejected rows (first {len(errors[:10])}):")
+        for error in errors[:10]:
+            print(f"  {error}")
+
+
+# ---------------------------
+# Write import files
+# ---------------------------
+class _Writer:
+    """
+    Row writer for one table's CSV (with header) or NDJSON file.
+    """
+
+    def __init__(self, path, fmt, fields):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.fields = fields
+        self.fmt = fmt
+        if fmt == "csv":
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(fields)
+
+    def write(self, row):
+        if self.fmt == "csv":
+            # Empty fields import as NULL.
+            self.csv.writerow(["" if row[f] is None else row[f] for f in self.fields])
+        else:
+            self.file.write(json.dumps({f: row[f] for f in self.fields}) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+def write_files(args):
+    households = household_count(args.humans)
+    os.makedirs(args.out, exist_ok=True)
+    paths = {table: os.path.join(args.out, f"{table}.{args.format}") for table in TABLES}
+    writers = {
+        "humans": _Writer(paths["humans"], args.format, ("id",) + HUMAN_FIELDS),
+        "documents": _Writer(paths["documents"], args.format, DOCUMENT_FIELDS),
+        "families": _Writer(paths["families"], args.format, FAMILY_FIELDS),
+    }
+    counts = {table: 0 for table in TABLES}
+    next_id = args.first_id
+    started = time.perf_counter()
+    try:
+        for index in range(households):
+            members, documents, links = household(args.seed, index)
+            ids = list(range(next_id, next_id + len(members)))
+            next_id += len(members)
+            for human_id, member in zip(ids, members):
+                writers["humans"].write(dict(member, id=human_id))
+            document_rows, family_rows = resolve(documents, links, ids)
+            for table, rows in (("documents", document_rows), ("families", family_rows)):
+                for row in rows:
+                    writers[table].write(row)
+            counts["humans"] += len(members)
+            counts["documents"] += len(document_rows)
+            counts["families"] += len(family_rows)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    print(f"Wrote {', '.join(paths.values())}")
+    report(counts, time.perf_counter() - started)
+
+    if args.do_import:
+        session_id = get_session(args.base_url, args.host, args.port, args.user, args.password, args.database)
+        with DatabaseSession(args.base_url, session_id) as db_session:
+            for table in TABLES:
+                result = db_session.import_file(table, paths[table], args.format)
+                print(f"Imported {table}: {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("mode", choices=("api", "files"))
+    parser.add_argument("--humans", type=int, default=10000, help="approximate number of humans")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=8, help="api: requests in flight")
+    parser.add_argument("--chunk", type=int, default=100, help="api: households per bulk request")
+    parser.add_argument("--batch-size", type=int, default=500, help="api: rows per INSERT on the server")
+    parser.add_argument("--out", default="data", help="files: output directory")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv", help="files: file format")
+    parser.add_argument("--first-id", type=int, default=1, help="files: id of the first human")
+    parser.add_argument("--import", dest="do_import", action="store_true",
+                        help="files: stream the written files into the database afterwards")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--host", default="postgres_collections_debug")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--database", default="default")
+    args = parser.parse_args()
+
+    if args.mode == "api":
+        asyncio.run(load_api(args))
+    else:
+        write_files(args)
+
+
+if __name__ == "__main__":
+    main()
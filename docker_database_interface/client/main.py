@@ -4,12 +4,13 @@ from datetime import datetime
 from datetime import datetime, timedelta
 import random
 
-def random_date(start_date, end_date):
+def random_date(start_date, end_date, rng=random):
+    # Pass a seeded random.Random as rng for reproducible dates
     # Calculate the difference between the start and end dates
     delta = end_date - start_date
     
     # Generate a random number of days to add
-    random_days = random.randint(0, delta.days)
+    random_days = rng.randint(0, delta.days)
     
     # Return the new randomized date
     return start_date + timedelta(days=random_days)
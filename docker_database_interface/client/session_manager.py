@@ -1,6 +1,49 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_session(base_url, host, port, user, password, database):
+# HTTP transport defaults. Connections are kept alive and reused from a pool of
+# POOL_SIZE per host; TIMEOUT is (connect, read) seconds. Failed connects are
+# retried for every method, read errors and 502/503/504 answers only for the
+# idempotent ones, RETRIES times with exponential backoff (BACKOFF * 2**n seconds).
+POOL_SIZE = 10
+TIMEOUT = (5, 60)
+RETRIES = 3
+BACKOFF = 0.3
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+
+_default_transport = None
+
+
+def create_transport(pool_size=POOL_SIZE, retries=RETRIES, backoff=BACKOFF):
+    """
+    A requests.Session with a keep-alive connection pool and bounded retries.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    transport = requests.Session()
+    transport.mount("http://", adapter)
+    transport.mount("https://", adapter)
+    return transport
+
+
+def default_transport():
+    """
+    Transport shared by the module-level helpers, created on first use.
+    """
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = create_transport()
+    return _default_transport
+
+
+def get_session(base_url, host, port, user, password, database, transport=None, timeout=TIMEOUT):
     """
     Helper function to create a session and return the session_id.
     """
@@ -12,7 +55,7 @@ def get_session(base_url, host, port, user, password, database):
         "password": password,
         "database": database
     }
-    response = requests.post(url, json=payload)
+    response = (transport or default_transport()).post(url, json=payload, timeout=timeout)
     if response.status_code == 200:
         session_id = response.json().get("session_id")
         print(f"Session created successfully: {session_id}")
@@ -24,11 +67,16 @@ def get_session(base_url, host, port, user, password, database):
 class DatabaseSession:
     """
     Context Manager for handling an existing database session.
+    Requests go through the session's own pooled keep-alive transport (see
+    create_transport), which is closed on exit.
     """
 
-    def __init__(self, base_url, session_id):
+    def __init__(self, base_url, session_id, pool_size=POOL_SIZE, timeout=TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF):
         self.base_url = base_url
         self.session_id = session_id
+        self.timeout = timeout
+        self.transport = create_transport(pool_size, retries, backoff)
 
     def __enter__(self):
         """
@@ -41,43 +89,69 @@ class DatabaseSession:
 
     def __exit__(self, exc_type, exc_value, traceback):
         """
-        Automatically closes the session when exiting the context.
+        Automatically closes the session and its HTTP transport when exiting the context.
         """
-        self.close_session()
+        try:
+            self.close_session()
+        finally:
+            self.transport.close()
+
+    def _request(self, method, endpoint, **kwargs):
+        url = f"{self.base_url}/{endpoint}"
+        kwargs.setdefault("timeout", self.timeout)
+        params = dict(kwargs.pop("params", None) or {}, session_id=self.session_id)
+        return self.transport.request(method, url, params=params, **kwargs)
 
     def close_session(self):
         """
         Close the existing session.
         """
-        url = f"{self.base_url}/session/close?session_id={self.session_id}"
-        response = requests.post(url)
+        response = self._request("POST", "session/close")
         if response.status_code == 200:
             print(f"Session {self.session_id} closed successfully.")
         else:
             print(f"Error closing session: {response.text}")
         self.session_id = None
 
-    def post(self, endpoint, data):
+    def post(self, endpoint, data, params=None):
         """
         Send a POST request using the existing session.
         """
-        url = f"{self.base_url}/{endpoint}?session_id={self.session_id}"
-        response = requests.post(url, json=data)
+        response = self._request("POST", endpoint, json=data, params=params)
         return response.json()
 
-    def get(self, endpoint):
+    def get(self, endpoint, params=None):
         """
         Send a GET request using the existing session.
         """
-        url = f"{self.base_url}/{endpoint}?session_id={self.session_id}"
-        response = requests.get(url)
+        response = self._request("GET", endpoint, params=params)
+        return response.json()
+
+    def put(self, endpoint, data, params=None):
+        """
+        Send a PUT request (the update routes) using the existing session.
+        """
+        response = self._request("PUT", endpoint, json=data, params=params)
+        return response.json()
+
+    def import_file(self, table_name, path, fmt=None):
+        """
+        Stream a CSV or NDJSON file into a table through the COPY import endpoint.
+        The file is sent as it is read, so it never has to fit in memory.
+        """
+        if fmt is None:
+            fmt = "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+        params = {"table_name": table_name, "format": fmt}
+        with open(path, "rb") as f:
+            # No read timeout: the server answers only once the whole file is loaded.
+            response = self._request("POST", "session/import", params=params, data=f,
+                                     timeout=(self.timeout[0], None))
         return response.json()
 
     def delete(self, endpoint):
         """
         Send a DELETE request using the existing session.
         """
-        url = f"{self.base_url}/{endpoint}?session_id={self.session_id}"
-        response = requests.delete(url)
+        response = self._request("DELETE", endpoint)
         return response.json()
 
@@ -1,7 +1,32 @@
-from .master import PostgresMaster
+from .master import PostgresMaster, RESULT_FORMATS
+from .pool import ConnectionPool, PoolTimeout
+from .async_engine import AsyncPostgresMaster, AsyncPostgresUser, create_async_pool
+from .importer import copy_import, CopyImportError, IMPORT_TABLES, IMPORT_FORMATS
+from .exporter import export_stream, EXPORT_FORMATS
+from .schema import schema_cache, SchemaCache, TableInfo
+from .queries import HUMAN_PROFILE_QUERY, FAMILY_GRAPH_QUERY, HUMAN_SEARCH_QUERY
+from .cache import TTLCache, entity_cache, entity_key, invalidate_entity
+from .stats import info_cache, database_info_query, info_cache_key, build_database_info, INFO_MODES
+from .migrate import run_migrations, migration_status, discover_migrations, MIGRATIONS_DIR
+from .pagination import InvalidCursor, PAGINATION_MODES, bundle_query, next_cursor, encode_cursor, decode_cursor
+from .pagination import search_position, next_search_cursor, bundle_version_query, version_columns, split_page_version
+from .fuzzy import FUZZY_COLUMNS, SIMILAR_QUERIES, DUPLICATE_PAIRS_QUERY, SET_THRESHOLD_QUERY, MAX_DUPLICATE_PAIRS
+from .fuzzy import DEFAULT_SIMILAR_THRESHOLD, DEFAULT_DUPLICATE_THRESHOLD, threshold_param, cluster_pairs
+from .upsert import CONFLICT_MODES, NATURAL_KEYS, batch_insert_query, row_insert_query
 import os
 from datetime import date
 
+import psycopg2
+from psycopg2.extras import execute_values
+
+# Insertable columns of each table, in the order used by the create_* methods.
+HUMAN_COLUMNS    = ("name", "birthday", "birthplace", "gender", "culture", "status", "biography", "comments")
+DOCUMENT_COLUMNS = ("related_human_id", "identifier_type", "source", "comments")
+FAMILY_COLUMNS   = ("related_human_id", "relation_type", "human_name", "human_id", "comments")
+
+# Table behind each entity name used in the routes.
+ENTITY_TABLES = {"human": "humans", "document": "documents", "family": "families"}
+
 # ---------------------------
 # User Interface (CRUD Operations)
 # ---------------------------
@@ -18,16 +43,22 @@ class PostgresUser:
         RETURNING id;
         """
         params = (name, birthday, birthplace, gender, culture, status, biography, comments)
-        result = self.master.execute(query, params)
+        result = self.master.execute(query, params, prepare=True)
         if result:
             return result[0]['id']
         else:
             raise Exception("Insertion failed, no ID returned.")
 
     def read_human(self, human_id):
+        key = entity_key(self.master, "humans", human_id)
+        cached = entity_cache.get(key)
+        if cached is not None:
+            return dict(cached)
         query = "SELECT * FROM humans WHERE id = %s;"
         params = (human_id,)
-        result = self.master.execute(query, params)
+        result = self.master.execute(query, params, prepare=True)
+        if result:
+            entity_cache.set(key, dict(result[0]))
         return result[0] if result else None
 
     def update_human(self, human_id, **kwargs):
@@ -40,11 +71,50 @@ class PostgresUser:
         set_clause = ", ".join(set_clauses)
         query = f"UPDATE humans SET {set_clause} WHERE id = %s;"
         self.master.execute(query, tuple(values))
+        invalidate_entity(self.master, "humans", human_id)
 
     def delete_human(self, human_id):
         query = "DELETE FROM humans WHERE id = %s;"
         params = (human_id,)
-        self.master.execute(query, params)
+        self.master.execute(query, params, prepare=True)
+        invalidate_entity(self.master, "humans", human_id, cascade=True)
+
+    def read_human_profile(self, human_id, documents_limit=None, families_limit=None):
+        """
+        A human together with their documents and family edges (families rows whose
+        related_human_id is the human), in one query. Limits cap each child list;
+        the *_total fields always give the full counts.
+        """
+        params = {"human_id": human_id, "documents_limit": documents_limit, "families_limit": families_limit}
+        result = self.master.execute(HUMAN_PROFILE_QUERY, params, prepare=True)
+        return result[0] if result else None
+
+    def get_family_graph(self, human_id, max_depth=3, relation_types=None, direction="both", target_id=None):
+        """
+        Relatives of a human within max_depth hops over the families table, computed
+        server-side with a recursive CTE (see FAMILY_GRAPH_QUERY). relation_types
+        restricts the edges followed; direction is "out", "in" or "both". With
+        target_id, "path" holds a shortest chain of human ids from human_id to it.
+        """
+        params = {
+            "human_id": human_id,
+            "max_depth": max_depth,
+            "relation_types": relation_types or None,
+            "directions": ["out", "in"] if direction == "both" else [direction],
+            "target_id": target_id
+        }
+        result = self.master.execute(FAMILY_GRAPH_QUERY, params, prepare=True)
+        return result[0] if result else None
+
+    def search_humans(self, q, limit=20, cursor=None):
+        """
+        Ranked full-text search over name, biography and comments (best match first).
+        Pass next_cursor back as cursor to fetch the following page.
+        """
+        after_rank, after_id = search_position(cursor)
+        params = {"q": q, "limit": limit, "after_rank": after_rank, "after_id": after_id}
+        rows = self.master.execute(HUMAN_SEARCH_QUERY, params, prepare=True) or []
+        return {"results": rows, "next_cursor": next_search_cursor(rows, limit)}
 
     # --- CRUD for Documents ---
     def create_document(self, related_human_id, identifier_type, source, comments=None):
@@ -54,16 +124,22 @@ class PostgresUser:
         RETURNING id;
         """
         params = (related_human_id, identifier_type, source, comments)
-        result = self.master.execute(query, params)
+        result = self.master.execute(query, params, prepare=True)
         if result:
             return result[0]['id']
         else:
             raise Exception("Document insertion failed.")
 
     def read_document(self, document_id):
+        key = entity_key(self.master, "documents", document_id)
+        cached = entity_cache.get(key)
+        if cached is not None:
+            return dict(cached)
         query = "SELECT * FROM documents WHERE id = %s;"
         params = (document_id,)
-        result = self.master.execute(query, params)
+        result = self.master.execute(query, params, prepare=True)
+        if result:
+            entity_cache.set(key, dict(result[0]))
         return result[0] if result else None
 
     def update_document(self, document_id, **kwargs):
@@ -76,11 +152,13 @@ class PostgresUser:
         set_clause = ", ".join(set_clauses)
         query = f"UPDATE documents SET {set_clause} WHERE id = %s;"
         self.master.execute(query, tuple(values))
+        invalidate_entity(self.master, "documents", document_id)
 
     def delete_document(self, document_id):
         query = "DELETE FROM documents WHERE id = %s;"
         params = (document_id,)
-        self.master.execute(query, params)
+        self.master.execute(query, params, prepare=True)
+        invalidate_entity(self.master, "documents", document_id)
 
     # --- CRUD for Families ---
     def create_family(self, related_human_id, relation_type, human_name, human_id=None, comments=None):
@@ -90,16 +168,22 @@ class PostgresUser:
         RETURNING id;
         """
         params = (related_human_id, relation_type, human_name, human_id, comments)
-        result = self.master.execute(query, params)
+        result = self.master.execute(query, params, prepare=True)
         if result:
             return result[0]['id']
         else:
             raise Exception("family insertion failed.")
 
     def read_family(self, family_id):
+        key = entity_key(self.master, "families", family_id)
+        cached = entity_cache.get(key)
+        if cached is not None:
+            return dict(cached)
         query = "SELECT * FROM families WHERE id = %s;"
         params = (family_id,)
-        result = self.master.execute(query, params)
+        result = self.master.execute(query, params, prepare=True)
+        if result:
+            entity_cache.set(key, dict(result[0]))
         return result[0] if result else None
 
     def update_family(self, family_id, **kwargs):
@@ -112,58 +196,252 @@ class PostgresUser:
         set_clause = ", ".join(set_clauses)
         query = f"UPDATE families SET {set_clause} WHERE id = %s;"
         self.master.execute(query, tuple(values))
+        invalidate_entity(self.master, "families", family_id)
 
     def delete_family(self, family_id):
         query = "DELETE FROM families WHERE id = %s;"
         params = (family_id,)
-        self.master.execute(query, params)
+        self.master.execute(query, params, prepare=True)
+        invalidate_entity(self.master, "families", family_id)
+
+    # --- Multi-get ---
+    def read_many(self, table, ids):
+        """
+        Fetch many rows of table by id with a single `id = ANY(...)` query; ids already
+        in the entity cache are served from it. Returns {id: row} for the ids found.
+        """
+        found = {}
+        misses = []
+        for entity_id in ids:
+            cached = entity_cache.get(entity_key(self.master, table, entity_id))
+            if cached is not None:
+                found[entity_id] = dict(cached)
+            else:
+                misses.append(entity_id)
+        if misses:
+            query = f"SELECT * FROM {table} WHERE id = ANY(%s);"
+            for row in self.master.execute(query, (misses,), prepare=True) or []:
+                entity_cache.set(entity_key(self.master, table, row['id']), dict(row))
+                found[row['id']] = row
+        return found
+
+    # --- Fuzzy name matching ---
+    def _fetch_with_threshold(self, threshold, query, params):
+        return self.master.execute_in_transaction([
+            (SET_THRESHOLD_QUERY, threshold_param(threshold)),
+            (query, params),
+        ]) or []
 
-    def get_bundle(self, table_name: str, offset: int = 0, limit: int = 100):
+    def find_similar(self, table, name, threshold=DEFAULT_SIMILAR_THRESHOLD, limit=20):
+        """
+        Rows of table (humans or families) whose name is trigram-similar to name,
+        most similar first, each with its similarity score.
+        """
+        return self._fetch_with_threshold(threshold, SIMILAR_QUERIES[table], {"name": name, "limit": limit})
+
+    def find_duplicate_humans(self, threshold=DEFAULT_DUPLICATE_THRESHOLD, limit=50):
+        """
+        Clusters of humans whose names are at least threshold-similar, best first.
+        Pairs are found in the database through the trigram index; each cluster
+        lists its member rows and the scored pairs linking them.
+        """
+        pairs = self._fetch_with_threshold(threshold, DUPLICATE_PAIRS_QUERY, {"max_pairs": MAX_DUPLICATE_PAIRS})
+        clusters = cluster_pairs(pairs, limit)
+        members = self.read_many("humans", [entity_id for c in clusters for entity_id in c["ids"]])
+        for cluster in clusters:
+            cluster["members"] = [members[entity_id] for entity_id in cluster["ids"] if entity_id in members]
+        return {"threshold": threshold, "truncated": len(pairs) >= MAX_DUPLICATE_PAIRS, "clusters": clusters}
+
+    def read_many_columnar(self, table, ids):
+        """
+        read_many for bulk consumers: {"columns", "rows"} ordered by id, fetched with a
+        tuple cursor and without going through the entity cache.
+        """
+        query = f"SELECT * FROM {table} WHERE id = ANY(%s) ORDER BY id;"
+        return self.master.execute_columnar(query, (ids,), prepare=True)
+
+    # --- Upserts ---
+    def upsert(self, table, values, on_conflict="ignore"):
+        """
+        Insert one row, resolving a natural-key conflict per on_conflict (see app.upsert)
+        in the same statement. Returns {"id", "created"}.
+        """
+        result = self.master.execute(row_insert_query(table, list(values), on_conflict), values, prepare=True)
+        if not result:
+            raise Exception(f"Upsert into {table} returned no ID; the conflicting row is not visible yet.")
+        row = result[0]
+        if not row['inserted'] and on_conflict == "update":
+            invalidate_entity(self.master, table, row['id'])
+        return {"id": row['id'], "created": row['inserted']}
+
+    # --- Bulk inserts ---
+    def bulk_create(self, table, columns, rows, batch_size=500, on_conflict="error"):
+        """
+        Insert many rows into table in a single transaction using multi-row INSERTs of
+        batch_size rows. A batch that violates a constraint is replayed row by row under
+        savepoints, so only the offending rows are rejected and the rest still commit.
+        on_conflict ("ignore" or "update") resolves natural-key duplicates instead of
+        rejecting them (see app.upsert).
+        Returns {"ids": [...], "errors": [...], "inserted": n} where ids follow the input
+        order and hold None for rejected rows, errors lists {"index", "error"} per rejected
+        row, and inserted counts the rows that are new.
+        """
+        batch_query = batch_insert_query(table, columns, on_conflict)
+        row_query = row_insert_query(table, columns, on_conflict)
+        values = [tuple(row.get(column) for column in columns) for row in rows]
+        ids = [None] * len(values)
+        inserted = 0
+        updated = []
+        errors = []
+
+        with self.master.transaction() as conn:
+            with conn.cursor() as cur:
+                for start in range(0, len(values), batch_size):
+                    batch = values[start:start + batch_size]
+                    cur.execute("SAVEPOINT bulk_batch;")
+                    try:
+                        returned = execute_values(cur, batch_query, batch, page_size=len(batch), fetch=True)
+                        # Ignore mode skips conflicting rows, which leaves ids unaligned.
+                        if len(returned) == len(batch):
+                            ids[start:start + len(batch)] = [row[0] for row in returned]
+                            inserted += sum(1 for row in returned if row[1])
+                            updated.extend(row[0] for row in returned if not row[1])
+                            cur.execute("RELEASE SAVEPOINT bulk_batch;")
+                            continue
+                    except psycopg2.Error:
+                        pass
+                    cur.execute("ROLLBACK TO SAVEPOINT bulk_batch;")
+
+                    # Replay the batch one row at a time to isolate the bad rows.
+                    for index, params in enumerate(batch, start):
+                        cur.execute("SAVEPOINT bulk_row;")
+                        try:
+                            cur.execute(row_query, dict(zip(columns, params)))
+                            row = cur.fetchone()
+                            if row is None:
+                                raise psycopg2.Error("Conflicting row is not visible yet; retry.")
+                            ids[index] = row[0]
+                            if row[1]:
+                                inserted += 1
+                            else:
+                                updated.append(row[0])
+                            cur.execute("RELEASE SAVEPOINT bulk_row;")
+                        except psycopg2.Error as e:
+                            cur.execute("ROLLBACK TO SAVEPOINT bulk_row;")
+                            errors.append({"index": index, "error": (e.pgerror or str(e)).strip()})
+                    cur.execute("RELEASE SAVEPOINT bulk_batch;")
+
+        if on_conflict == "update":
+            for entity_id in updated:
+                invalidate_entity(self.master, table, entity_id)
+        return {"ids": ids, "errors": errors, "inserted": inserted}
+
+    def bulk_create_human(self, humans, batch_size=500, on_conflict="error"):
+        return self.bulk_create("humans", HUMAN_COLUMNS, humans, batch_size, on_conflict)
+
+    def bulk_create_document(self, documents, batch_size=500, on_conflict="error"):
+        return self.bulk_create("documents", DOCUMENT_COLUMNS, documents, batch_size, on_conflict)
+
+    def bulk_create_family(self, families, batch_size=500, on_conflict="error"):
+        return self.bulk_create("families", FAMILY_COLUMNS, families, batch_size, on_conflict)
+
+    # --- Streaming import ---
+    def import_stream(self, table_name, fmt, chunks):
+        """
+        COPY a CSV/NDJSON stream of byte chunks into table_name (see app.importer).
+        """
+        table = schema_cache.table(self.master, table_name)
+        return copy_import(self.master, table_name, fmt, chunks,
+                           dict(table.columns) if table else {})
+
+    # --- Streaming export ---
+    def export_table(self, table_name, fmt="ndjson", chunk_size=2000):
+        """
+        Validate table_name and return a generator streaming the whole table (see app.exporter).
+        """
+        table = schema_cache.table(self.master, table_name)
+        if table is None:
+            return None
+        return export_stream(self.master, table_name, fmt, chunk_size, table.primary_key)
+
+    def get_bundle(self, table_name: str, offset: int = 0, limit: int = 100,
+                   cursor: str = None, pagination: str = "offset", format: str = "rows",
+                   versioned: bool = False):
         """
         Fetches a bundle of rows from the specified table with pagination.
         Consistent with existing CRUD methods.
+        Rows are ordered by primary key. pagination="offset" pages with OFFSET/LIMIT;
+        pagination="cursor" resumes after the `cursor` token of the previous page and
+        returns the token for the next one as next_cursor. format="columnar" returns
+        {"columns", "rows"} (value arrays) instead of {"bundle": [row objects]}.
+        versioned=True also returns the page's "version" (as get_bundle_version would)
+        from the same query, for ETags.
         """
         try:
-            # ✅ Validate the table exists
-            table_check_query = """
-                SELECT EXISTS (
-                    SELECT 1 FROM information_schema.tables 
-                    WHERE table_schema = 'public' AND table_name = %s
-                );
-            """
-            result = self.master.execute(table_check_query, (table_name,))
-            if not result or not result[0]['exists']:
+            # ✅ Validate the table exists (from the cached schema, no catalog round trip)
+            table = schema_cache.table(self.master, table_name)
+            if table is None:
                 return {"error": f"Table '{table_name}' does not exist."}
 
             # ✅ Fetch paginated data
-            data_query = f"SELECT * FROM {table_name} OFFSET %s LIMIT %s;"
-            rows = self.master.execute(data_query, (offset, limit))
+            select = "*, " + version_columns(table.primary_key) if versioned else "*"
+            data_query, params = bundle_query(table_name, table.primary_key, offset, limit, cursor, pagination,
+                                              select=select)
+            if format == "columnar":
+                result = self.master.execute_columnar(data_query, params)
+                if versioned:
+                    result["rows"], result["columns"], result["version"] = split_page_version(
+                        result["rows"], result["columns"])
+                if pagination == "cursor":
+                    result["next_cursor"] = next_cursor(result["rows"], limit, table.primary_key,
+                                                        result["columns"])
+                return result
+            rows = self.master.execute(data_query, params)
 
-            # ✅ Convert rows to list of dictionaries
-            bundle = [dict(row) for row in rows] if rows else []
+            # ✅ RealDictCursor rows already are dictionaries
+            bundle = rows or []
 
-            return {"bundle": bundle}
+            result = {"bundle": bundle}
+            if versioned:
+                result["bundle"], _, result["version"] = split_page_version(bundle)
+            if pagination == "cursor":
+                result["next_cursor"] = next_cursor(bundle, limit, table.primary_key)
+            return result
 
         except Exception as e:
             return {"error": str(e)}
 
 
-    def get_database_info(self):
-        # Summary for humans
-        query_humans = "SELECT COUNT(*) AS total_items, MIN(id) AS min_id, MAX(id) AS max_id FROM humans;"
-        humans_stats = self.master.execute(query_humans)
-        # Summary for documents
-        query_documents = "SELECT COUNT(*) AS total_items, MIN(id) AS min_id, MAX(id) AS max_id FROM documents;"
-        documents_stats = self.master.execute(query_documents)
-        # Summary for families
-        query_families = "SELECT COUNT(*) AS total_items, MIN(id) AS min_id, MAX(id) AS max_id FROM families;"
-        families_stats = self.master.execute(query_families)
-
-        return {
-            "humans": humans_stats[0] if humans_stats else {},
-            "documents": documents_stats[0] if documents_stats else {},
-            "families": families_stats[0] if families_stats else {}
-        }
+    def get_bundle_version(self, table_name: str, offset: int = 0, limit: int = 100,
+                           cursor: str = None, pagination: str = "offset"):
+        """
+        Cheap version token of a bundle page (see bundle_version_query), for ETags.
+        None when the table does not exist or the page can't be read (e.g. a cursor
+        whose key doesn't match the column type); get_bundle reports why.
+        """
+        table = schema_cache.table(self.master, table_name)
+        if table is None:
+            return None
+        try:
+            query, params = bundle_version_query(table_name, table.primary_key, offset, limit, cursor, pagination)
+            return self.master.execute(query, params)[0]['version']
+        except (InvalidCursor, psycopg2.Error):
+            return None
+
+    def get_database_info(self, mode: str = "exact"):
+        """
+        Row count and id range of humans, documents and families in one round trip.
+        mode="estimate" reads planner statistics instead of counting rows. Answers are
+        cached for DATABASE_INFO_TTL seconds; "meta" reports the mode and cache age.
+        """
+        key = info_cache_key(self.master, mode)
+        entry = info_cache.get_entry(key)
+        if entry is not None:
+            rows, age = entry
+            return build_database_info(rows, mode, age, cached=True)
+        rows = self.master.execute(database_info_query(mode))
+        info_cache.set(key, rows)
+        return build_database_info(rows, mode)
 
 def create_new_database(master, new_database: str):
     """
@@ -173,18 +451,17 @@ def create_new_database(master, new_database: str):
     """
     create_db_query = f"CREATE DATABASE {new_database};"
     master.execute(create_db_query)
+    schema_cache.invalidate(master.host, master.port, new_database)
     return f"Database '{new_database}' created successfully."
 
 
-def populate_database_with_schema(new_db_config: dict, init_sql_path: str = None):
+def populate_database_with_schema(new_db_config: dict, migrations_dir: str = None):
     """
-    Connect to the new database using new_db_config and run the SQL schema defined in init.sql.
+    Connect to the new database using new_db_config and bring its schema up to date by
+    applying the versioned migrations (see app.migrate).
     new_db_config should be a dict containing keys: host, port, user, password, and database.
-    By default, init.sql is assumed to be in the same directory as this __init__.py file.
+    By default, migrations are read from the migrations/ directory next to this file.
     """
-    if init_sql_path is None:
-        init_sql_path = os.path.join(os.path.dirname(__file__), "init.sql")
-    
     new_master = PostgresMaster(
         new_db_config['host'],
         new_db_config['port'],
@@ -194,16 +471,12 @@ def populate_database_with_schema(new_db_config: dict, init_sql_path: str = None
     )
     new_master.__enter__()
     try:
-        with open(init_sql_path, 'r') as f:
-            init_sql = f.read()
-        # Split SQL statements on semicolon; adjust if your SQL is more complex.
-        statements = [stmt.strip() for stmt in init_sql.split(';') if stmt.strip()]
-        for statement in statements:
-            new_master.execute(statement + ';')
+        applied = run_migrations(new_master, migrations_dir)
     finally:
         new_master.__exit__(None, None, None)
+        schema_cache.invalidate(new_db_config['host'], new_db_config['port'], new_db_config['database'])
     
-    return f"Database '{new_db_config['database']}' populated with schema from {init_sql_path}."
+    return f"Database '{new_db_config['database']}' populated with schema migrations {applied}."
 
 # ---------------------------
 # Example Usage
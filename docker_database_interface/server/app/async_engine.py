@@ -0,0 +1,313 @@
+from contextlib import asynccontextmanager
+
+from .pagination import bundle_query, bundle_version_query, next_cursor, search_position, next_search_cursor
+from .pagination import InvalidCursor, version_columns, split_page_version
+from .schema import schema_cache
+from .queries import HUMAN_PROFILE_QUERY, FAMILY_GRAPH_QUERY, HUMAN_SEARCH_QUERY
+from .cache import entity_cache, entity_key, invalidate_entity
+from .fuzzy import SIMILAR_QUERIES, DUPLICATE_PAIRS_QUERY, SET_THRESHOLD_QUERY, MAX_DUPLICATE_PAIRS
+from .fuzzy import DEFAULT_SIMILAR_THRESHOLD, DEFAULT_DUPLICATE_THRESHOLD, threshold_param, cluster_pairs
+from .upsert import row_insert_query
+from .stats import info_cache, database_info_query, info_cache_key, build_database_info
+
+try:
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+    from psycopg.rows import dict_row, tuple_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # The async engine is optional; the sync engine only needs psycopg2.
+    psycopg = None
+
+
+def _require_psycopg():
+    if psycopg is None:
+        raise RuntimeError("The async engine requires 'psycopg[binary]' and 'psycopg_pool'.")
+
+
+def create_async_pool(host, port, user, password, database, min_size=1, max_size=15, timeout=30.0):
+    """
+    Build an (unopened) asyncio connection pool; await pool.open() inside the event loop.
+    """
+    _require_psycopg()
+    # Pin the client encoding so text always decodes to str, as it does with psycopg2.
+    conninfo = make_conninfo(host=host, port=port, user=user, password=password, dbname=database,
+                             client_encoding="utf8")
+    return AsyncConnectionPool(
+        conninfo,
+        min_size=min_size,
+        max_size=max_size,
+        timeout=timeout,
+        kwargs={"autocommit": True, "row_factory": dict_row},
+        open=False
+    )
+
+
+# ---------------------------
+# Async Master Interface
+# ---------------------------
+class AsyncPostgresMaster:
+    """
+    asyncio counterpart of PostgresMaster backed by a psycopg 3 AsyncConnectionPool.
+    Rows come back as dictionaries, matching PostgresMaster's RealDictCursor.
+    """
+
+    def __init__(self, host, port, user, password, database, pool):
+        self.host     = host
+        self.port     = port
+        self.user     = user
+        self.password = password
+        self.database = database
+        self.pool     = pool
+
+    @property
+    def key(self):
+        return (self.host, self.port, self.user, self.password, self.database)
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self.pool.connection() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Yield a connection inside a transaction, committed or rolled back with the block.
+        """
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                yield conn
+
+    async def execute(self, query, params=None):
+        """
+        Execute an SQL command; returns a list of dict rows, or None for statements without results.
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                if cur.description is None:
+                    return None
+                return await cur.fetchall()
+
+    async def execute_columnar(self, query, params=None):
+        """
+        Execute a query with a tuple cursor; returns {"columns": [...], "rows": [...]}.
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor(row_factory=tuple_row) as cur:
+                await cur.execute(query, params)
+                return {"columns": [column.name for column in cur.description], "rows": await cur.fetchall()}
+
+
+# ---------------------------
+# Async User Interface (CRUD Operations)
+# ---------------------------
+class AsyncPostgresUser:
+    """
+    asyncio counterpart of PostgresUser. Method names, arguments and results match
+    PostgresUser so routes can use either one.
+    """
+
+    def __init__(self, master: AsyncPostgresMaster):
+        self.master = master
+
+    async def _insert(self, table, values):
+        columns = ", ".join(values)
+        placeholders = ", ".join(["%s"] * len(values))
+        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) RETURNING id;"
+        result = await self.master.execute(query, tuple(values.values()))
+        if result:
+            return result[0]['id']
+        raise Exception(f"Insertion into {table} failed, no ID returned.")
+
+    async def upsert(self, table, values, on_conflict="ignore"):
+        result = await self.master.execute(row_insert_query(table, list(values), on_conflict), values)
+        if not result:
+            raise Exception(f"Upsert into {table} returned no ID; the conflicting row is not visible yet.")
+        row = result[0]
+        if not row['inserted'] and on_conflict == "update":
+            invalidate_entity(self.master, table, row['id'])
+        return {"id": row['id'], "created": row['inserted']}
+
+    async def _read(self, table, entity_id):
+        key = entity_key(self.master, table, entity_id)
+        cached = entity_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        result = await self.master.execute(f"SELECT * FROM {table} WHERE id = %s;", (entity_id,))
+        if result:
+            entity_cache.set(key, dict(result[0]))
+        return result[0] if result else None
+
+    async def _update(self, table, entity_id, values):
+        set_clause = ", ".join(f"{key} = %s" for key in values)
+        query = f"UPDATE {table} SET {set_clause} WHERE id = %s;"
+        await self.master.execute(query, tuple(values.values()) + (entity_id,))
+        invalidate_entity(self.master, table, entity_id)
+
+    async def _delete(self, table, entity_id):
+        await self.master.execute(f"DELETE FROM {table} WHERE id = %s;", (entity_id,))
+        invalidate_entity(self.master, table, entity_id, cascade=True)
+
+    async def read_many(self, table, ids):
+        found = {}
+        misses = []
+        for entity_id in ids:
+            cached = entity_cache.get(entity_key(self.master, table, entity_id))
+            if cached is not None:
+                found[entity_id] = dict(cached)
+            else:
+                misses.append(entity_id)
+        if misses:
+            query = f"SELECT * FROM {table} WHERE id = ANY(%s);"
+            for row in await self.master.execute(query, (misses,)) or []:
+                entity_cache.set(entity_key(self.master, table, row['id']), dict(row))
+                found[row['id']] = row
+        return found
+
+    async def _fetch_with_threshold(self, threshold, query, params):
+        async with self.master.transaction() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(SET_THRESHOLD_QUERY, threshold_param(threshold))
+                await cur.execute(query, params)
+                return await cur.fetchall()
+
+    async def find_similar(self, table, name, threshold=DEFAULT_SIMILAR_THRESHOLD, limit=20):
+        return await self._fetch_with_threshold(threshold, SIMILAR_QUERIES[table], {"name": name, "limit": limit})
+
+    async def find_duplicate_humans(self, threshold=DEFAULT_DUPLICATE_THRESHOLD, limit=50):
+        pairs = await self._fetch_with_threshold(threshold, DUPLICATE_PAIRS_QUERY, {"max_pairs": MAX_DUPLICATE_PAIRS})
+        clusters = cluster_pairs(pairs, limit)
+        members = await self.read_many("humans", [entity_id for c in clusters for entity_id in c["ids"]])
+        for cluster in clusters:
+            cluster["members"] = [members[entity_id] for entity_id in cluster["ids"] if entity_id in members]
+        return {"threshold": threshold, "truncated": len(pairs) >= MAX_DUPLICATE_PAIRS, "clusters": clusters}
+
+    async def read_many_columnar(self, table, ids):
+        query = f"SELECT * FROM {table} WHERE id = ANY(%s) ORDER BY id;"
+        return await self.master.execute_columnar(query, (ids,))
+
+    # --- CRUD for Humans ---
+    async def create_human(self, name, birthday, birthplace, gender, culture,
+                           status='missing', biography=None, comments=None):
+        return await self._insert("humans", dict(
+            name=name, birthday=birthday, birthplace=birthplace, gender=gender,
+            culture=culture, status=status, biography=biography, comments=comments
+        ))
+
+    async def read_human(self, human_id):
+        return await self._read("humans", human_id)
+
+    async def update_human(self, human_id, **kwargs):
+        await self._update("humans", human_id, kwargs)
+
+    async def delete_human(self, human_id):
+        await self._delete("humans", human_id)
+
+    async def read_human_profile(self, human_id, documents_limit=None, families_limit=None):
+        params = {"human_id": human_id, "documents_limit": documents_limit, "families_limit": families_limit}
+        result = await self.master.execute(HUMAN_PROFILE_QUERY, params)
+        return result[0] if result else None
+
+    async def get_family_graph(self, human_id, max_depth=3, relation_types=None, direction="both", target_id=None):
+        params = {
+            "human_id": human_id,
+            "max_depth": max_depth,
+            "relation_types": relation_types or None,
+            "directions": ["out", "in"] if direction == "both" else [direction],
+            "target_id": target_id
+        }
+        result = await self.master.execute(FAMILY_GRAPH_QUERY, params)
+        return result[0] if result else None
+
+    async def search_humans(self, q, limit=20, cursor=None):
+        after_rank, after_id = search_position(cursor)
+        params = {"q": q, "limit": limit, "after_rank": after_rank, "after_id": after_id}
+        rows = await self.master.execute(HUMAN_SEARCH_QUERY, params) or []
+        return {"results": rows, "next_cursor": next_search_cursor(rows, limit)}
+
+    # --- CRUD for Documents ---
+    async def create_document(self, related_human_id, identifier_type, source, comments=None):
+        return await self._insert("documents", dict(
+            related_human_id=related_human_id, identifier_type=identifier_type,
+            source=source, comments=comments
+        ))
+
+    async def read_document(self, document_id):
+        return await self._read("documents", document_id)
+
+    async def update_document(self, document_id, **kwargs):
+        await self._update("documents", document_id, kwargs)
+
+    async def delete_document(self, document_id):
+        await self._delete("documents", document_id)
+
+    # --- CRUD for Families ---
+    async def create_family(self, related_human_id, relation_type, human_name, human_id=None, comments=None):
+        return await self._insert("families", dict(
+            related_human_id=related_human_id, relation_type=relation_type,
+            human_name=human_name, human_id=human_id, comments=comments
+        ))
+
+    async def read_family(self, family_id):
+        return await self._read("families", family_id)
+
+    async def update_family(self, family_id, **kwargs):
+        await self._update("families", family_id, kwargs)
+
+    async def delete_family(self, family_id):
+        await self._delete("families", family_id)
+
+    async def get_bundle(self, table_name: str, offset: int = 0, limit: int = 100,
+                         cursor: str = None, pagination: str = "offset", format: str = "rows",
+                         versioned: bool = False):
+        """
+        Fetches a bundle of rows from the specified table with pagination.
+        """
+        try:
+            table = await schema_cache.table_async(self.master, table_name)
+            if table is None:
+                return {"error": f"Table '{table_name}' does not exist."}
+
+            select = "*, " + version_columns(table.primary_key) if versioned else "*"
+            data_query, params = bundle_query(table_name, table.primary_key, offset, limit, cursor, pagination,
+                                              select=select)
+            if format == "columnar":
+                result = await self.master.execute_columnar(data_query, params)
+                if versioned:
+                    result["rows"], result["columns"], result["version"] = split_page_version(
+                        result["rows"], result["columns"])
+                if pagination == "cursor":
+                    result["next_cursor"] = next_cursor(result["rows"], limit, table.primary_key,
+                                                        result["columns"])
+                return result
+            rows = await self.master.execute(data_query, params) or []
+            result = {"bundle": rows}
+            if versioned:
+                result["bundle"], _, result["version"] = split_page_version(rows)
+            if pagination == "cursor":
+                result["next_cursor"] = next_cursor(rows, limit, table.primary_key)
+            return result
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_bundle_version(self, table_name: str, offset: int = 0, limit: int = 100,
+                                 cursor: str = None, pagination: str = "offset"):
+        table = await schema_cache.table_async(self.master, table_name)
+        if table is None:
+            return None
+        try:
+            query, params = bundle_version_query(table_name, table.primary_key, offset, limit, cursor, pagination)
+            return (await self.master.execute(query, params))[0]['version']
+        except (InvalidCursor, psycopg.Error):
+            return None
+
+    async def get_database_info(self, mode: str = "exact"):
+        key = info_cache_key(self.master, mode)
+        entry = info_cache.get_entry(key)
+        if entry is not None:
+            rows, age = entry
+            return build_database_info(rows, mode, age, cached=True)
+        rows = await self.master.execute(database_info_query(mode))
+        info_cache.set(key, rows)
+        return build_database_info(rows, mode)
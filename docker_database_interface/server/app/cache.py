@@ -0,0 +1,118 @@
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire ttl seconds after being stored.
+
+    - maxsize: entries kept before the least recently used one is evicted (0 = unbounded).
+    - ttl:     seconds an entry stays valid (0 = never expires).
+    Hits, misses, evictions and expirations are counted for stats().
+    """
+
+    def __init__(self, maxsize=0, ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_entry(self, key):
+        """
+        (value, age in seconds) for key, or None on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl and now - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, now - stored_at
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while self.maxsize and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def evict_where(self, predicate):
+        """
+        Drop every entry for which predicate(key, value) is true; returns how many.
+        """
+        with self._lock:
+            doomed = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in doomed:
+                del self._data[key]
+        return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Read-through cache of single entities (read_human/read_document/read_family).
+ENTITY_CACHE_SIZE = int(os.environ.get("ENTITY_CACHE_SIZE", "10000"))
+ENTITY_CACHE_TTL  = float(os.environ.get("ENTITY_CACHE_TTL", "30"))
+
+entity_cache = TTLCache(maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL)
+
+# Tables whose rows reference humans(id) with ON DELETE CASCADE.
+HUMAN_CHILD_TABLES = ("documents", "families")
+
+
+def entity_key(master, table, entity_id):
+    return (master.host, master.port, master.database, table, entity_id)
+
+
+def invalidate_entity(master, table, entity_id, cascade=False):
+    """
+    Forget a cached row after it was updated or deleted. Deleting a human cascades to
+    its documents and families in the database, so pass cascade=True on delete to drop
+    their cached rows too; that scans the whole cache, so updates leave it off.
+    """
+    entity_cache.pop(entity_key(master, table, entity_id))
+    if cascade and table == "humans":
+        database = (master.host, master.port, master.database)
+        entity_cache.evict_where(
+            lambda key, row: key[:3] == database and key[3] in HUMAN_CHILD_TABLES
+            and row.get("related_human_id") == entity_id
+        )
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _json_default(value):
+    # date/datetime/time come back from psycopg2 as Python objects.
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _ndjson_chunk(columns, rows):
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+    ).encode()
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        ["" if value is None else _json_default(value) if hasattr(value, "isoformat") else value
+         for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+def export_stream(master, table_name, fmt, chunk_size=2000, primary_key="id"):
+    """
+    Generator of encoded chunks holding every row of table_name, ordered by primary key.
+
+    Rows are read through a named (server-side) cursor, chunk_size at a time, so
+    memory stays flat however large the table is and the first chunk is produced as
+    soon as the first fetch returns. The caller validates table_name and fmt.
+    """
+    with master.stream_connection() as conn:
+        # Named cursors only live inside a transaction; the pool/connection restores
+        # autocommit when the connection is handed back.
+        conn.autocommit = False
+        try:
+            with conn.cursor(name=f"export_{table_name}") as cur:
+                cur.itersize = chunk_size
+                order = f" ORDER BY {primary_key}" if primary_key else ""
+                cur.execute(f"SELECT * FROM {table_name}{order};")
+                rows = cur.fetchmany(chunk_size)
+                columns = [column[0] for column in cur.description]
+                if fmt == "csv":
+                    yield _csv_chunk([columns])
+                while rows:
+                    yield _ndjson_chunk(columns, rows) if fmt == "ndjson" else _csv_chunk(rows)
+                    rows = cur.fetchmany(chunk_size)
+        finally:
+            if not conn.closed:
+                conn.rollback()
+                conn.autocommit = True
@@ -0,0 +1,75 @@
+"""
+Trigram (pg_trgm) name matching, served by the GIN indexes of migration 0004.
+
+Both queries filter with the `%` operator, which is what the indexes accelerate;
+its cut-off is the pg_trgm.similarity_threshold setting, so callers run
+SET_THRESHOLD_QUERY first, in the same transaction.
+"""
+
+# Name column matched in each table that supports fuzzy lookups.
+FUZZY_COLUMNS = {"humans": "name", "families": "human_name"}
+
+DEFAULT_SIMILAR_THRESHOLD = 0.3
+DEFAULT_DUPLICATE_THRESHOLD = 0.6
+
+# Upper bound on candidate pairs a duplicate scan returns, so a low threshold on a
+# large table cannot produce an unbounded result.
+MAX_DUPLICATE_PAIRS = 10000
+
+# Transaction-local, so pooled connections go back with the default threshold.
+SET_THRESHOLD_QUERY = "SELECT set_config('pg_trgm.similarity_threshold', %s, true);"
+
+_SIMILAR_QUERY = """
+    SELECT *, similarity({column}, %(name)s) AS similarity
+    FROM {table}
+    WHERE {column} %% %(name)s
+    ORDER BY similarity DESC, id
+    LIMIT %(limit)s;
+"""
+
+SIMILAR_QUERIES = {table: _SIMILAR_QUERY.format(table=table, column=column)
+                   for table, column in FUZZY_COLUMNS.items()}
+
+# Every pair of humans whose names are at least threshold-similar, found with one
+# index probe per human instead of a pairwise comparison of the whole table.
+DUPLICATE_PAIRS_QUERY = """
+    SELECT a.id AS id, b.id AS candidate_id, similarity(a.name, b.name) AS similarity
+    FROM humans a
+    JOIN humans b ON b.name %% a.name AND b.id > a.id
+    ORDER BY similarity DESC, a.id, b.id
+    LIMIT %(max_pairs)s;
+"""
+
+
+def threshold_param(threshold):
+    # set_config takes text.
+    return (str(float(threshold)),)
+
+
+def cluster_pairs(pairs, limit):
+    """
+    Group candidate pairs into clusters (connected components) and rank them by
+    their best pair similarity, then size. Returns at most limit clusters as
+    {"score", "ids", "pairs"}.
+    """
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for pair in pairs:
+        parent[find(pair['id'])] = find(pair['candidate_id'])
+
+    clusters = {}
+    for pair in pairs:
+        cluster = clusters.setdefault(find(pair['id']), {"score": 0.0, "ids": set(), "pairs": []})
+        cluster["score"] = max(cluster["score"], pair['similarity'])
+        cluster["ids"].update((pair['id'], pair['candidate_id']))
+        cluster["pairs"].append(dict(pair))
+
+    ranked = sorted(clusters.values(), key=lambda c: (-c["score"], -len(c["ids"]), min(c["ids"])))
+    return [{"score": c["score"], "ids": sorted(c["ids"]), "pairs": c["pairs"]} for c in ranked[:limit]]
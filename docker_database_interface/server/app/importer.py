@@ -0,0 +1,286 @@
+import csv
+import io
+import json
+import re
+import time
+
+import psycopg2
+
+# Tables that accept streamed imports.
+IMPORT_TABLES = ("humans", "documents", "families")
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# How many rejected rows are echoed back with their reason.
+MAX_REJECT_SAMPLES = 10
+
+# Staged rows are moved in one INSERT; when a value doesn't fit the table, they are
+# moved in batches of this many, and a failing batch is replayed row by row.
+IMPORT_BATCH_SIZE = 5000
+
+_TYPE_MODIFIER = re.compile(r"\(.*?\)")
+
+
+class CopyImportError(Exception):
+    """
+    Raised for imports that cannot start: unknown table/format or a bad header.
+    """
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    Raw binary stream over an iterator of byte chunks, so the body can be decoded
+    and split into lines incrementally without ever holding the whole upload.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class _CopySource:
+    """
+    File-like object handed to copy_expert. Each read() converts just enough parsed
+    rows into COPY CSV text to fill the request, counting malformed rows on the way.
+    Every row is prefixed with its sequence number and source line for the staging table.
+    """
+
+    def __init__(self, rows, width, stats):
+        self._rows = rows
+        self._width = width
+        self._stats = stats
+        self._buffer = ""
+
+    def _reject(self, line, reason):
+        self._stats["rejected_malformed"] += 1
+        _sample(self._stats, line, reason)
+
+    def read(self, size=-1):
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            try:
+                line, values = next(self._rows)
+            except StopIteration:
+                break
+            if isinstance(values, str):
+                self._reject(line, values)
+                continue
+            if len(values) != self._width:
+                self._reject(line, f"Expected {self._width} fields, got {len(values)}.")
+                continue
+            self._stats["rows_read"] += 1
+            text = f"{self._stats['rows_read']},{line}," + ",".join(_copy_field(value) for value in values) + "\n"
+            parts.append(text)
+            length += len(text)
+        data = "".join(parts)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _sample(stats, line, reason):
+    if len(stats["rejected_samples"]) < MAX_REJECT_SAMPLES:
+        stats["rejected_samples"].append({"line": line, "error": reason})
+
+
+def _cast(column, data_type):
+    # Cast to the base type only: an explicit cast to varchar(n) would silently
+    # truncate, while the assignment into the table reports the overflow.
+    return f"CAST({column} AS {_TYPE_MODIFIER.sub('', data_type)})"
+
+
+def _move_rows(cur, insert, stats):
+    """
+    Run insert (an INSERT ... SELECT over import_staging, open-ended on a seq range)
+    for every staged row, rejecting only the rows whose values the table refuses.
+    Returns the number of rows inserted.
+    """
+    cur.execute("SAVEPOINT import_all;")
+    try:
+        cur.execute(insert, (1, stats["rows_read"]))
+        inserted = cur.rowcount
+        cur.execute("RELEASE SAVEPOINT import_all;")
+        return inserted
+    except psycopg2.Error:
+        cur.execute("ROLLBACK TO SAVEPOINT import_all;")
+
+    cur.execute("CREATE INDEX ON import_staging (seq);")
+    inserted = 0
+    for start in range(1, stats["rows_read"] + 1, IMPORT_BATCH_SIZE):
+        end = min(start + IMPORT_BATCH_SIZE - 1, stats["rows_read"])
+        cur.execute("SAVEPOINT import_batch;")
+        try:
+            cur.execute(insert, (start, end))
+            inserted += cur.rowcount
+            cur.execute("RELEASE SAVEPOINT import_batch;")
+            continue
+        except psycopg2.Error:
+            cur.execute("ROLLBACK TO SAVEPOINT import_batch;")
+
+        # Replay the batch one row at a time to isolate the bad rows.
+        cur.execute("SELECT seq, line FROM import_staging WHERE seq BETWEEN %s AND %s ORDER BY seq;", (start, end))
+        for seq, line in cur.fetchall():
+            cur.execute("SAVEPOINT import_row;")
+            try:
+                cur.execute(insert, (seq, seq))
+                inserted += cur.rowcount
+                cur.execute("RELEASE SAVEPOINT import_row;")
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT import_row;")
+                stats["rejected_invalid"] += 1
+                _sample(stats, line, (e.pgerror or str(e)).strip())
+    return inserted
+
+
+def _copy_field(value):
+    # Unquoted empty means NULL in COPY CSV; everything else is quoted verbatim.
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _csv_rows(text):
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if not header:
+        raise CopyImportError("CSV body is empty; a header row is required.")
+    header = [column.strip() for column in header]
+
+    def rows():
+        for values in reader:
+            if not values:
+                continue
+            # Empty fields are loaded as NULL, like COPY's own CSV mode.
+            yield reader.line_num, [value if value != "" else None for value in values]
+
+    return header, rows()
+
+
+def _ndjson_rows(text):
+    lines = enumerate(text, start=1)
+    for line_number, line in lines:
+        if line.strip():
+            break
+    else:
+        raise CopyImportError("NDJSON body is empty.")
+    try:
+        first = json.loads(line)
+    except ValueError as e:
+        raise CopyImportError(f"Line {line_number}: invalid JSON ({e}).")
+    if not isinstance(first, dict) or not first:
+        raise CopyImportError(f"Line {line_number}: every NDJSON line must be a JSON object.")
+    header = list(first)
+
+    def rows():
+        yield line_number, [first[column] for column in header]
+        for number, raw in lines:
+            if not raw.strip():
+                continue
+            try:
+                item = json.loads(raw)
+            except ValueError as e:
+                yield number, f"Invalid JSON ({e})."
+                continue
+            if not isinstance(item, dict):
+                yield number, "Line is not a JSON object."
+                continue
+            unknown = set(item) - set(header)
+            if unknown:
+                yield number, f"Unexpected keys: {', '.join(sorted(unknown))}."
+                continue
+            yield number, [item.get(column) for column in header]
+
+    return header, rows()
+
+
+def copy_import(master, table_name, fmt, chunks, table_columns):
+    """
+    Stream a CSV or NDJSON body into table_name with COPY ... FROM STDIN.
+
+    Columns are mapped by the CSV header / the keys of the first NDJSON object and
+    must all exist in table_columns ({column: data type}). Rows are copied as text
+    into a temporary staging table and then moved with INSERT ... ON CONFLICT DO
+    NOTHING, so re-importing rows that already exist rejects them instead of
+    aborting the load. Malformed rows (wrong field count, bad JSON) and rows with a
+    value the table refuses (an unparseable date, a missing foreign key, a NOT NULL
+    or length violation) are skipped, counted and sampled with their line number.
+    Everything runs in one transaction on one connection.
+    """
+    if table_name not in IMPORT_TABLES:
+        raise CopyImportError(f"Table '{table_name}' does not accept imports.")
+    if fmt not in IMPORT_FORMATS:
+        raise CopyImportError(f"Unknown format '{fmt}'; expected one of {', '.join(IMPORT_FORMATS)}.")
+
+    started = time.monotonic()
+    text = io.TextIOWrapper(io.BufferedReader(_ChunkReader(chunks)), encoding="utf-8", newline="")
+    header, rows = _csv_rows(text) if fmt == "csv" else _ndjson_rows(text)
+
+    unknown = [column for column in header if column not in table_columns]
+    if unknown:
+        raise CopyImportError(f"Unknown columns for '{table_name}': {', '.join(unknown)}.")
+    if len(set(header)) != len(header):
+        raise CopyImportError("Duplicate column names in header.")
+
+    stats = {"rows_read": 0, "rejected_malformed": 0, "rejected_invalid": 0, "rejected_samples": []}
+    column_list = ", ".join(header)
+    # Staged as text so a bad value can't abort the COPY; it is rejected on the move.
+    staging_columns = ", ".join(f"{column} text" for column in header)
+    insert = (
+        f"INSERT INTO {table_name} ({column_list}) "
+        f"SELECT {', '.join(_cast(column, table_columns[column]) for column in header)} "
+        f"FROM import_staging WHERE seq BETWEEN %s AND %s ORDER BY seq ON CONFLICT DO NOTHING;"
+    )
+
+    with master.transaction() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"CREATE TEMP TABLE import_staging (seq integer, line integer, {staging_columns}) "
+                f"ON COMMIT DROP;"
+            )
+            cur.copy_expert(
+                f"COPY import_staging (seq, line, {column_list}) FROM STDIN WITH (FORMAT csv);",
+                _CopySource(rows, len(header), stats)
+            )
+            inserted = _move_rows(cur, insert, stats)
+            if "id" in header:
+                # Explicit ids bypass the serial sequence; move it past them.
+                cur.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"GREATEST((SELECT MAX(id) FROM {table_name}), 1));",
+                    (table_name,)
+                )
+
+    elapsed = time.monotonic() - started
+    return {
+        "table": table_name,
+        "format": fmt,
+        "columns": header,
+        "rows_read": stats["rows_read"],
+        "inserted": inserted,
+        "rejected": {
+            "malformed": stats["rejected_malformed"],
+            "invalid": stats["rejected_invalid"],
+            "conflicts": stats["rows_read"] - stats["rejected_invalid"] - inserted,
+            "samples": stats["rejected_samples"],
+        },
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(stats["rows_read"] / elapsed, 1) if elapsed > 0 else None,
+    }
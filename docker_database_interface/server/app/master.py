@@ -1,43 +1,165 @@
 #!/usr/bin/env python3
+from contextlib import contextmanager
+from threading import RLock
+
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from .prepared import PREPARED_STATEMENTS, STALE_STATEMENT_ERRORS, StatementCacheConnection
+from .schema import schema_cache
+
+# Shapes of multi-row results: one JSON object per row, or "columnar" - the column
+# names once plus one array of values per row.
+RESULT_FORMATS = ("rows", "columnar")
+
 # ---------------------------
 # Master Interface (Context Manager)
 # ---------------------------
 class PostgresMaster:
-    def __init__(self, host, port, user, password, database):
+    def __init__(self, host, port, user, password, database, pool=None):
         self.host     = host
         self.port     = port
         self.user     = user
         self.password = password
         self.database = database
+        self.pool     = pool
         self.conn     = None
+        # Serializes units of work on the dedicated connection (unused when pooled).
+        self._lock    = RLock()
 
-    def __enter__(self):
-        self.conn = psycopg2.connect(
+    @property
+    def key(self):
+        """
+        Identifies the database this master talks to; sessions with equal keys share a pool.
+        """
+        return (self.host, self.port, self.user, self.password, self.database)
+
+    def connect(self):
+        """
+        Open a new raw connection with this master's configuration.
+        """
+        return psycopg2.connect(
             host=self.host,
             port=self.port,
             user=self.user,
             password=self.password,
-            database=self.database
+            database=self.database,
+            connection_factory=StatementCacheConnection
         )
-        # Enable autocommit to simplify DDL/DML operations.
-        self.conn.autocommit = True
+
+    def __enter__(self):
+        # Pooled masters check a connection out per execute instead of holding one.
+        if self.pool is None:
+            self.conn = self.connect()
+            # Enable autocommit to simplify DDL/DML operations.
+            self.conn.autocommit = True
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         if self.conn is not None:
             self.conn.close()
+            self.conn = None
+
+    @contextmanager
+    def connection(self):
+        """
+        Yield a connection for one unit of work: checked out of the pool and back in
+        when pooled, otherwise the master's own dedicated connection.
+        """
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                yield conn
+        else:
+            with self._lock:
+                yield self.conn
+
+    @contextmanager
+    def stream_connection(self):
+        """
+        Connection for long-running streaming work that may be resumed from different
+        threads (e.g. a StreamingResponse body): a pooled connection, or a fresh one
+        when unpooled so the session's dedicated connection isn't held by the stream.
+        """
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                yield conn
+        else:
+            conn = self.connect()
+            conn.autocommit = True
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yield a connection inside an explicit transaction: committed when the block
+        succeeds, rolled back when it raises. Connections stay in autocommit mode, so
+        the transaction is driven with BEGIN/COMMIT/ROLLBACK statements.
+        """
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("BEGIN;")
+            try:
+                yield conn
+            except BaseException:
+                if not conn.closed:
+                    with conn.cursor() as cur:
+                        cur.execute("ROLLBACK;")
+                raise
+            with conn.cursor() as cur:
+                cur.execute("COMMIT;")
 
-    def execute(self, query, params=None):
+    def execute(self, query, params=None, prepare=False):
         """
         Execute an SQL command using a RealDictCursor so that rows are returned as dictionaries.
+        With prepare=True the query runs as a server-side prepared statement cached on
+        the connection (see app.prepared); use it for static query text only.
         """
-        with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(query, params)
+        with self.connection() as conn:
+            return self._execute(conn, query, params, prepare)
+
+    def execute_in_transaction(self, statements):
+        """
+        Run (query, params) pairs in order on one connection inside a single
+        transaction, e.g. a SET LOCAL followed by the query it applies to.
+        Returns the rows of the last statement, as execute() does.
+        """
+        result = None
+        with self.transaction() as conn:
+            for query, params in statements:
+                result = self._execute(conn, query, params)
+        return result
+
+    def execute_columnar(self, query, params=None, prepare=False):
+        """
+        Execute a query with a plain tuple cursor and return {"columns": [...], "rows": [...]}:
+        the column names once and one value tuple per row, with no per-row dict.
+        """
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                self._run(conn, cur, query, params, prepare)
+                return {"columns": [column[0] for column in cur.description], "rows": cur.fetchall()}
+
+    def _execute(self, conn, query, params=None, prepare=False):
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            self._run(conn, cur, query, params, prepare)
             try:
                 result = cur.fetchall()
             except psycopg2.ProgrammingError:
                 result = None
         return result
+
+    def _run(self, conn, cur, query, params, prepare):
+        if prepare and PREPARED_STATEMENTS and isinstance(conn, StatementCacheConnection):
+            try:
+                conn.execute_prepared(cur, query, params, schema_cache.generation)
+            except STALE_STATEMENT_ERRORS:
+                # Only retry outside an explicit transaction, which the error aborted.
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    raise
+                conn.clear_statements(cur)
+                conn.execute_prepared(cur, query, params, schema_cache.generation)
+        else:
+            cur.execute(query, params)
@@ -0,0 +1,145 @@
+import os
+import re
+
+from .schema import schema_cache
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+# Migration files are named <version>_<name>.sql and applied in version order.
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# A migration whose first line is this marker runs outside a transaction, one
+# statement at a time (needed for CREATE INDEX CONCURRENTLY). Statements in such
+# files are split on ';' at the end of a line, so keep one statement per ';'.
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+# A CREATE INDEX CONCURRENTLY that fails leaves an INVALID index behind, which
+# IF NOT EXISTS would then skip on the re-run. Such leftovers are dropped first.
+CONCURRENT_INDEX = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+INVALID_INDEX_QUERY = """
+    SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%s) AND NOT indisvalid;
+"""
+
+VERSION_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# Session-level advisory lock so two runners never migrate the same database at once.
+MIGRATION_LOCK_ID = 727001
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def read(self):
+        with open(self.path, "r") as f:
+            return f.read()
+
+    @property
+    def transactional(self):
+        return not self.read().lstrip().startswith(NO_TRANSACTION_MARKER)
+
+
+def discover_migrations(migrations_dir=None):
+    """
+    Every migration file in migrations_dir, sorted by version.
+    """
+    migrations_dir = migrations_dir or MIGRATIONS_DIR
+    migrations = []
+    for filename in os.listdir(migrations_dir):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2),
+                                        os.path.join(migrations_dir, filename)))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions in {migrations_dir}.")
+    return migrations
+
+
+def _split_statements(sql):
+    statements = []
+    for chunk in re.split(r";\s*$", sql, flags=re.MULTILINE):
+        lines = [line for line in chunk.splitlines() if not line.strip().startswith("--")]
+        statement = "\n".join(lines).strip()
+        if statement:
+            statements.append(statement + ";")
+    return statements
+
+
+def _apply(cur, migration):
+    sql = migration.read()
+    record = ("INSERT INTO schema_migrations (version, name) VALUES (%s, %s);",
+              (migration.version, migration.name))
+    if migration.transactional:
+        cur.execute("BEGIN;")
+        try:
+            cur.execute(sql)
+            cur.execute(*record)
+        except BaseException:
+            cur.execute("ROLLBACK;")
+            raise
+        cur.execute("COMMIT;")
+    else:
+        for statement in _split_statements(sql):
+            _drop_invalid_index(cur, statement)
+            cur.execute(statement)
+        cur.execute(*record)
+
+
+def _drop_invalid_index(cur, statement):
+    match = CONCURRENT_INDEX.match(statement)
+    if match is None:
+        return
+    cur.execute(INVALID_INDEX_QUERY, (match.group(1),))
+    if cur.fetchone():
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)};")
+
+
+def migration_status(master, migrations_dir=None):
+    """
+    [{"version", "name", "applied"}] for every known migration.
+    """
+    master.execute(VERSION_TABLE_QUERY)
+    applied = {row['version'] for row in master.execute("SELECT version FROM schema_migrations;") or []}
+    return [{"version": m.version, "name": m.name, "applied": m.version in applied}
+            for m in discover_migrations(migrations_dir)]
+
+
+def run_migrations(master, migrations_dir=None, target=None):
+    """
+    Apply every pending migration (up to target, if given) to the master's database
+    and record each one in schema_migrations. Transactional migrations are applied
+    atomically; no-transaction ones statement by statement. Returns the versions
+    applied, in order.
+    """
+    migrations = discover_migrations(migrations_dir)
+    applied_now = []
+    with master.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+            try:
+                cur.execute(VERSION_TABLE_QUERY)
+                cur.execute("SELECT version FROM schema_migrations;")
+                applied = {row[0] for row in cur.fetchall()}
+                for migration in migrations:
+                    if target is not None and migration.version > target:
+                        break
+                    if migration.version in applied:
+                        continue
+                    _apply(cur, migration)
+                    applied_now.append(migration.version)
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+                schema_cache.invalidate(master.host, master.port, master.database)
+    return applied_now
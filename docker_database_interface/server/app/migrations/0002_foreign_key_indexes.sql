@@ -0,0 +1,10 @@
+-- migrate: no-transaction
+-- Indexes for the humans(id) references. The UNIQUE constraints already index
+-- (related_human_id, ...) composites, but these narrow indexes are what ON DELETE
+-- CASCADE checks and child lookups (profiles, family graph) want, and nothing
+-- indexed families.human_id at all. CONCURRENTLY builds them without blocking
+-- writes on live databases. A failed build leaves an INVALID index that IF NOT
+-- EXISTS would skip, so the runner drops invalid ones before re-running (migrate.py).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS families_related_human_id_idx ON families (related_human_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_related_human_id_idx ON documents (related_human_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS families_human_id_idx ON families (human_id);
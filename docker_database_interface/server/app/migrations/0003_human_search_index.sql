@@ -0,0 +1,16 @@
+-- migrate: no-transaction
+-- Full-text search over humans (name, biography, comments). The document is built
+-- by an IMMUTABLE function and indexed as an expression rather than stored in a
+-- generated column: adding a stored column would rewrite the table under an
+-- exclusive lock and leak the tsvector into every SELECT * read. Queries must call
+-- human_search_document(name, biography, comments) verbatim to use the index.
+CREATE OR REPLACE FUNCTION human_search_document(name TEXT, biography TEXT, comments TEXT)
+RETURNS tsvector
+LANGUAGE SQL IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A')
+        || setweight(to_tsvector('english'::regconfig, coalesce(biography, '')), 'B')
+        || setweight(to_tsvector('english'::regconfig, coalesce(comments, '')), 'C')
+$$;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS humans_search_idx
+    ON humans USING GIN (human_search_document(name, biography, comments));
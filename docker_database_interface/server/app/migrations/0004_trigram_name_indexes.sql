@@ -0,0 +1,9 @@
+-- migrate: no-transaction
+-- Trigram indexes for fuzzy name lookups and duplicate detection (app/fuzzy.py).
+-- pg_trgm ships with PostgreSQL's contrib modules and is a trusted extension, so
+-- the database owner can create it without superuser rights.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS humans_name_trgm_idx
+    ON humans USING GIN (name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS families_human_name_trgm_idx
+    ON families USING GIN (human_name gin_trgm_ops);
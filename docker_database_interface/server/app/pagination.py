@@ -0,0 +1,133 @@
+import base64
+import hashlib
+import json
+
+PAGINATION_MODES = ("offset", "cursor")
+
+# Extra columns a versioned bundle page selects; split_page_version() strips them.
+ROW_KEY = "_bundle_row_key"
+ROW_VERSION = "_bundle_row_version"
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination token cannot be decoded.
+    """
+
+
+def encode_cursor(position: dict) -> str:
+    """
+    Encode a page position (e.g. {"id": 42}) as an opaque, URL-safe token.
+    """
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    """
+    Decode a token produced by encode_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        position = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(position, dict):
+        raise InvalidCursor("Invalid cursor.")
+    return position
+
+
+def bundle_query(table_name, primary_key="id", offset=0, limit=100, cursor=None, pagination="offset",
+                 select="*"):
+    """
+    Build the (query, params) pair for one bundle page, ordered by primary key
+    (tables without a single-column key only support unordered offset paging).
+
+    Offset mode skips `offset` rows; cursor mode resumes after the last key of the
+    previous page (WHERE pk > last LIMIT n), so every page costs the same.
+    """
+    if pagination not in PAGINATION_MODES:
+        raise InvalidCursor(f"Unknown pagination mode '{pagination}'.")
+    if pagination == "offset":
+        order = f" ORDER BY {primary_key}" if primary_key else ""
+        query = f"SELECT {select} FROM {table_name}{order} OFFSET %s LIMIT %s;"
+        return query, (offset, limit)
+    if not primary_key:
+        raise InvalidCursor(f"Table '{table_name}' has no single-column primary key to page by.")
+    if cursor:
+        last = decode_cursor(cursor).get(primary_key)
+        if last is None:
+            raise InvalidCursor("Invalid cursor.")
+        query = f"SELECT {select} FROM {table_name} WHERE {primary_key} > %s ORDER BY {primary_key} LIMIT %s;"
+        return query, (last, limit)
+    query = f"SELECT {select} FROM {table_name} ORDER BY {primary_key} LIMIT %s;"
+    return query, (limit,)
+
+
+def version_columns(primary_key):
+    """
+    Select list of the (key, xmin) pair a page version is digested from. xmin changes
+    whenever a row is updated, so the digest changes exactly when the page's rows do.
+    """
+    return f"{primary_key or 'ctid'}::text AS {ROW_KEY}, xmin::text AS {ROW_VERSION}"
+
+
+def bundle_version_query(table_name, primary_key="id", offset=0, limit=100, cursor=None, pagination="offset"):
+    """
+    (query, params) digesting the (key, xmin) pairs of the rows the same bundle page
+    would return, without fetching or serializing them. Only worth a round trip to
+    answer If-None-Match; otherwise fetch the page with version columns and use
+    split_page_version(), which yields the same digest.
+    """
+    page, params = bundle_query(table_name, primary_key, offset, limit, cursor, pagination,
+                                select=version_columns(primary_key))
+    query = (f"SELECT md5(COALESCE(string_agg({ROW_KEY} || ':' || {ROW_VERSION}, ','), '')) AS version "
+             f"FROM ({page.rstrip(';')}) page;")
+    return query, params
+
+
+def split_page_version(rows, columns=None):
+    """
+    Strip the version columns from a page fetched with select="*, " + version_columns(...)
+    and digest them like bundle_version_query. rows are dicts, or value tuples when
+    columns is given. Returns (rows, columns, version).
+    """
+    pairs = []
+    if columns is None:
+        for row in rows:
+            pairs.append(f"{row.pop(ROW_KEY)}:{row.pop(ROW_VERSION)}")
+    else:
+        pairs = [f"{row[-2]}:{row[-1]}" for row in rows]
+        rows = [row[:-2] for row in rows]
+        columns = columns[:-2]
+    return rows, columns, hashlib.md5(",".join(pairs).encode()).hexdigest()
+
+
+def next_cursor(rows, limit, primary_key="id", columns=None):
+    """
+    Token for the page after rows, or None when rows was the last page. Pass columns
+    when rows are value tuples (columnar results) rather than dicts.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    key = columns.index(primary_key) if columns is not None else primary_key
+    return encode_cursor({primary_key: rows[-1][key]})
+
+
+def search_position(cursor):
+    """
+    (after_rank, after_id) from a search cursor, or (None, None) for the first page.
+    """
+    if not cursor:
+        return None, None
+    position = decode_cursor(cursor)
+    rank, last_id = position.get("rank"), position.get("id")
+    if not isinstance(rank, (int, float)) or not isinstance(last_id, int):
+        raise InvalidCursor("Invalid cursor.")
+    return rank, last_id
+
+
+def next_search_cursor(rows, limit):
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor({"rank": rows[-1]["rank"], "id": rows[-1]["id"]})
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from threading import Condition
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection could be checked out before the timeout expired.
+    """
+
+
+# ---------------------------
+# Connection Pool (shared by every session of one database config)
+# ---------------------------
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+
+    - size:         connections kept open once they have been created.
+    - min_idle:     connections opened up front and kept ready.
+    - max_overflow: extra connections allowed under load; they are closed
+                    as soon as they are checked back in.
+    - timeout:      seconds a checkout waits for a free connection.
+    """
+
+    def __init__(self, connect, size=5, min_idle=1, max_overflow=10, timeout=30.0):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self._connect     = connect
+        self.size         = size
+        self.min_idle     = min(min_idle, size)
+        self.max_overflow = max(max_overflow, 0)
+        self.timeout      = timeout
+        self._idle        = []
+        self._open        = 0
+        self._closed      = False
+        self._cond        = Condition()
+
+        for _ in range(self.min_idle):
+            self._idle.append(self._new_connection())
+            self._open += 1
+
+    def _new_connection(self):
+        conn = self._connect()
+        conn.autocommit = True
+        return conn
+
+    def getconn(self):
+        """
+        Check a connection out of the pool, opening a new one if the bounds allow it.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Pool is closed.")
+                while self._idle:
+                    conn = self._idle.pop()
+                    if not conn.closed:
+                        return conn
+                    self._open -= 1
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No connection available after {self.timeout} seconds "
+                        f"({self._open} open)."
+                    )
+                self._cond.wait(remaining)
+
+        # Connect outside the lock so a slow server doesn't stall other checkouts.
+        try:
+            return self._new_connection()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn, discard=False):
+        """
+        Return a connection to the pool. Broken or overflow connections are closed.
+        """
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if not conn.autocommit:
+                    conn.autocommit = True
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            keep = (not discard and not conn.closed and not self._closed
+                    and len(self._idle) + 1 <= self.size
+                    and self._open <= self.size)
+            if keep:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+        if not keep and not conn.closed:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check a connection out for the duration of a with-block.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def closeall(self):
+        """
+        Close every idle connection; checked-out ones are closed when returned.
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "min_idle": self.min_idle,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+            }
@@ -0,0 +1,98 @@
+"""
+Per-connection cache of server-side prepared statements.
+
+A query sent with PostgresMaster.execute(..., prepare=True) is PREPAREd on the
+connection the first time it is seen there and afterwards run with EXECUTE, so
+Postgres parses and plans it once per connection instead of once per call.
+"""
+import os
+import re
+from collections import OrderedDict
+
+from psycopg2 import errors, extensions
+
+# Set DB_PREPARED_STATEMENTS=0 behind poolers that don't keep server sessions
+# (e.g. PgBouncer in transaction mode); queries then go out as plain text.
+PREPARED_STATEMENTS = os.environ.get("DB_PREPARED_STATEMENTS", "1") not in ("0", "false", "False")
+
+# Statements kept per connection; the least recently used one is deallocated.
+PREPARED_CACHE_SIZE = int(os.environ.get("DB_PREPARED_CACHE_SIZE", "64"))
+
+# Errors meaning a prepared statement went stale: dropped server-side, or its
+# result type changed under a schema change made outside this service.
+STALE_STATEMENT_ERRORS = (errors.InvalidSqlStatementName, errors.FeatureNotSupported)
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+def to_positional(query):
+    """
+    Rewrite psycopg2 placeholders as $1, $2, ... for PREPARE. Returns the rewritten
+    query and, for %(name)s placeholders, the parameter names in $n order (None
+    for %s placeholders).
+    """
+    names = []
+    counter = [0]
+
+    def replace(match):
+        if match.group(0) == "%%":
+            return "%"
+        if match.group(1) is None:
+            counter[0] += 1
+            return f"${counter[0]}"
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f"${names.index(match.group(1)) + 1}"
+
+    sql = _PLACEHOLDER.sub(replace, query).strip().rstrip(";")
+    if names and counter[0]:
+        raise ValueError("Cannot mix %s and %(name)s placeholders in a prepared query.")
+    return sql, (names if names else None)
+
+
+class StatementCacheConnection(extensions.connection):
+    """
+    psycopg2 connection carrying its own LRU of prepared statements (query text ->
+    statement name). It lives as long as the connection, and is dropped whenever
+    the schema generation it was built under changes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = OrderedDict()
+        self.statement_generation = None
+        self._statement_counter = 0
+
+    def clear_statements(self, cur):
+        if self.statements:
+            cur.execute("DEALLOCATE ALL;")
+            self.statements.clear()
+
+    def execute_prepared(self, cur, query, params, generation):
+        """
+        Run query on cur through a prepared statement, preparing it first if needed.
+        """
+        if self.statement_generation != generation:
+            self.clear_statements(cur)
+            self.statement_generation = generation
+
+        entry = self.statements.get(query)
+        if entry is None:
+            sql, names = to_positional(query)
+            self._statement_counter += 1
+            name = f"stmt_{self._statement_counter}"
+            cur.execute(f"PREPARE {name} AS {sql};")
+            entry = self.statements[query] = (name, names)
+            if len(self.statements) > PREPARED_CACHE_SIZE:
+                _, (evicted_name, _) = self.statements.popitem(last=False)
+                cur.execute(f"DEALLOCATE {evicted_name};")
+        else:
+            self.statements.move_to_end(query)
+
+        name, names = entry
+        if names is not None:
+            params = tuple(params[param] for param in names)
+        if not params:
+            cur.execute(f"EXECUTE {name};")
+        else:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))});", params)
@@ -0,0 +1,110 @@
+"""
+Static SQL shared by the sync (PostgresUser) and async (AsyncPostgresUser) engines.
+"""
+
+# A human with its documents and family edges, aggregated to JSON in one statement.
+# LIMIT NULL means no limit, so unset per-collection limits return every row.
+HUMAN_PROFILE_QUERY = """
+    SELECT to_json(h) AS human,
+           (SELECT COALESCE(json_agg(to_json(d) ORDER BY d.id), '[]'::json)
+            FROM (SELECT * FROM documents WHERE related_human_id = h.id
+                  ORDER BY id LIMIT %(documents_limit)s) d) AS documents,
+           (SELECT COUNT(*) FROM documents WHERE related_human_id = h.id) AS documents_total,
+           (SELECT COALESCE(json_agg(to_json(f) ORDER BY f.id), '[]'::json)
+            FROM (SELECT * FROM families WHERE related_human_id = h.id
+                  ORDER BY id LIMIT %(families_limit)s) f) AS families,
+           (SELECT COUNT(*) FROM families WHERE related_human_id = h.id) AS families_total
+    FROM humans h
+    WHERE h.id = %(human_id)s;
+"""
+
+# Kinship graph around one human. families rows are edges related_human_id -> human_id
+# labelled with relation_type; only edges whose human_id is set can be walked.
+# Edges are followed outwards ("out": relatives this human lists), inwards ("in":
+# humans listing this one) or both, and collapsed to distinct (node, neighbour) pairs
+# first, so reciprocal rows (Father/Son, Spouse/Spouse) don't multiply the walk.
+# The walk is breadth-first up to max_depth: each step is one row holding the whole
+# frontier of that depth, expanded only to nodes not visited before, so it costs
+# O(nodes + edges) rather than one row per simple path. Nodes are reported at their
+# shortest depth, edges are every families row between reached nodes (plus unlinked
+# rows leaving a reached node), and path is a shortest route to target_id when given,
+# rebuilt backwards through the depth levels. edges is NOT MATERIALIZED so each
+# lookup is inlined and served by the families (related_human_id) / (human_id)
+# indexes instead of copying the whole table per request.
+FAMILY_GRAPH_WALK = """
+    WITH RECURSIVE edges AS NOT MATERIALIZED (
+        SELECT DISTINCT node, neighbour FROM (
+            SELECT related_human_id AS node, human_id AS neighbour
+            FROM families
+            WHERE human_id IS NOT NULL AND 'out' = ANY(%(directions)s::text[])
+              AND (%(relation_types)s::text[] IS NULL OR relation_type = ANY(%(relation_types)s::text[]))
+            UNION ALL
+            SELECT human_id, related_human_id
+            FROM families
+            WHERE human_id IS NOT NULL AND 'in' = ANY(%(directions)s::text[])
+              AND (%(relation_types)s::text[] IS NULL OR relation_type = ANY(%(relation_types)s::text[]))
+        ) directed
+        WHERE node <> neighbour
+    ),
+    walk (depth, frontier, visited) AS (
+        SELECT 0, ARRAY[%(human_id)s::integer], ARRAY[%(human_id)s::integer]
+        UNION ALL
+        SELECT w.depth + 1, step.frontier, w.visited || step.frontier
+        FROM walk w
+        CROSS JOIN LATERAL (
+            SELECT array_agg(DISTINCT e.neighbour) AS frontier
+            FROM edges e
+            WHERE e.node = ANY(w.frontier) AND NOT e.neighbour = ANY(w.visited)
+        ) step
+        WHERE w.depth < %(max_depth)s AND step.frontier IS NOT NULL
+    ),
+    reached AS (
+        SELECT node, w.depth FROM walk w CROSS JOIN LATERAL unnest(w.frontier) AS node
+    ),
+    route (node, depth, path) AS (
+        SELECT node, depth, ARRAY[node] FROM reached WHERE node = %(target_id)s
+        UNION ALL
+        SELECT back.node, r.depth - 1, back.node || r.path
+        FROM route r
+        CROSS JOIN LATERAL (
+            SELECT MIN(p.node) AS node
+            FROM reached p JOIN edges e ON e.node = p.node AND e.neighbour = r.node
+            WHERE p.depth = r.depth - 1
+        ) back
+        WHERE r.depth > 0
+    )
+"""
+
+FAMILY_GRAPH_QUERY = FAMILY_GRAPH_WALK + """
+    SELECT
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'id', r.node, 'name', h.name, 'depth', r.depth, 'exists', h.id IS NOT NULL)
+                ORDER BY r.depth, r.node), '[]'::json)
+         FROM reached r LEFT JOIN humans h ON h.id = r.node) AS nodes,
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'id', f.id, 'source', f.related_human_id, 'target', f.human_id,
+                    'relation_type', f.relation_type, 'human_name', f.human_name)
+                ORDER BY f.id), '[]'::json)
+         FROM families f
+         WHERE f.related_human_id IN (SELECT node FROM reached)
+           AND (f.human_id IS NULL OR f.human_id IN (SELECT node FROM reached))
+           AND (%(relation_types)s::text[] IS NULL OR f.relation_type = ANY(%(relation_types)s::text[]))
+        ) AS edges,
+        (SELECT path FROM route WHERE depth = 0) AS path;
+"""
+
+# Ranked full-text search over humans, served by the humans_search_idx expression
+# index (migration 0003). Pages are keyed on (rank DESC, id ASC): pass the last
+# row's rank and id as after_rank/after_id to continue.
+HUMAN_SEARCH_QUERY = """
+    SELECT * FROM (
+        SELECT h.*, ts_rank(human_search_document(h.name, h.biography, h.comments), q) AS rank
+        FROM humans h, websearch_to_tsquery('english', %(q)s) q
+        WHERE human_search_document(h.name, h.biography, h.comments) @@ q
+    ) ranked
+    WHERE %(after_id)s::integer IS NULL
+       OR rank < %(after_rank)s::real
+       OR (rank = %(after_rank)s::real AND id > %(after_id)s::integer)
+    ORDER BY rank DESC, id
+    LIMIT %(limit)s;
+"""
@@ -0,0 +1,126 @@
+import os
+import time
+from threading import Lock
+
+# Seconds a loaded schema is trusted before it is read from the catalog again.
+SCHEMA_CACHE_TTL = float(os.environ.get("SCHEMA_CACHE_TTL", "300"))
+
+# One catalog round trip: every column of every table in the public schema,
+# flagged when it belongs to the table's primary key.
+SCHEMA_QUERY = """
+    SELECT cl.relname::text AS table_name,
+           a.attname::text AS column_name,
+           format_type(a.atttypid, a.atttypmod) AS data_type,
+           COALESCE(a.attnum = ANY(i.indkey), false) AS is_primary
+    FROM pg_class cl
+    JOIN pg_namespace n ON n.oid = cl.relnamespace
+    JOIN pg_attribute a ON a.attrelid = cl.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_index i ON i.indrelid = cl.oid AND i.indisprimary
+    WHERE n.nspname = 'public' AND cl.relkind IN ('r', 'p')
+    ORDER BY cl.relname, a.attnum;
+"""
+
+
+class TableInfo:
+    """
+    Columns (name -> type, in table order) and single-column primary key of one table.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.columns = {}
+        self.primary_key = None
+
+    def as_dict(self):
+        return {"columns": dict(self.columns), "primary_key": self.primary_key}
+
+
+def _build(rows):
+    tables = {}
+    primary = {}
+    for row in rows or []:
+        table = tables.setdefault(row['table_name'], TableInfo(row['table_name']))
+        table.columns[row['column_name']] = row['data_type']
+        if row['is_primary']:
+            primary.setdefault(table.name, []).append(row['column_name'])
+    for name, columns in primary.items():
+        if len(columns) == 1:
+            tables[name].primary_key = columns[0]
+    return tables
+
+
+class SchemaCache:
+    """
+    Per-database cache of table names, column types and primary keys, loaded with a
+    single catalog query and refreshed once it is older than ttl seconds. Schema
+    changes made through this service invalidate it explicitly.
+    """
+
+    def __init__(self, ttl=SCHEMA_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = Lock()
+        # Bumped by every invalidate(); per-connection prepared statements built
+        # under an older generation are discarded (see app.prepared).
+        self.generation = 0
+
+    @staticmethod
+    def database_key(master):
+        return (master.host, master.port, master.database)
+
+    def _fresh(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def _store(self, key, rows):
+        tables = _build(rows)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), tables)
+        return tables
+
+    def tables(self, master):
+        """
+        {table name: TableInfo} for the master's database, loading it if stale.
+        """
+        key = self.database_key(master)
+        tables = self._fresh(key)
+        if tables is None:
+            tables = self._store(key, master.execute(SCHEMA_QUERY))
+        return tables
+
+    async def tables_async(self, master):
+        """
+        Same as tables() for an AsyncPostgresMaster.
+        """
+        key = self.database_key(master)
+        tables = self._fresh(key)
+        if tables is None:
+            tables = self._store(key, await master.execute(SCHEMA_QUERY))
+        return tables
+
+    def table(self, master, table_name):
+        """
+        TableInfo for table_name, or None if the table does not exist.
+        """
+        return self.tables(master).get(table_name)
+
+    async def table_async(self, master, table_name):
+        return (await self.tables_async(master)).get(table_name)
+
+    def invalidate(self, host=None, port=None, database=None):
+        """
+        Drop the cached schema of one database, or of every database when called
+        without arguments.
+        """
+        with self._lock:
+            self.generation += 1
+            if database is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((host, port, database), None)
+
+
+schema_cache = SchemaCache()
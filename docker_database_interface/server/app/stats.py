@@ -0,0 +1,53 @@
+import os
+
+from .cache import TTLCache
+
+# Tables summarised by /database-info.
+INFO_TABLES = ("humans", "documents", "families")
+INFO_MODES = ("exact", "estimate")
+
+# Seconds a /database-info answer is reused before the database is asked again.
+DATABASE_INFO_TTL = float(os.environ.get("DATABASE_INFO_TTL", "5"))
+
+info_cache = TTLCache(maxsize=1024, ttl=DATABASE_INFO_TTL)
+
+
+def database_info_query(mode="exact"):
+    """
+    One statement summarising every table in INFO_TABLES.
+
+    exact:    COUNT(*) plus MIN/MAX(id) per table (COUNT scans the table).
+    estimate: row count from the planner statistics in pg_class.reltuples and
+              MIN/MAX(id) read from the primary-key index, so no table is scanned.
+              Tables that were never analyzed fall back to an exact count.
+    """
+    if mode not in INFO_MODES:
+        raise ValueError(f"Unknown mode '{mode}'; expected one of {', '.join(INFO_MODES)}.")
+    parts = []
+    for table in INFO_TABLES:
+        if mode == "exact":
+            parts.append(
+                f"SELECT '{table}' AS table_name, COUNT(*) AS total_items, "
+                f"MIN(id) AS min_id, MAX(id) AS max_id FROM {table}"
+            )
+        else:
+            parts.append(
+                f"SELECT '{table}' AS table_name, "
+                f"(SELECT CASE WHEN reltuples < 0 THEN (SELECT COUNT(*) FROM {table}) "
+                f"ELSE reltuples::bigint END FROM pg_class WHERE oid = '{table}'::regclass) AS total_items, "
+                f"(SELECT MIN(id) FROM {table}) AS min_id, (SELECT MAX(id) FROM {table}) AS max_id"
+            )
+    return "\nUNION ALL\n".join(parts) + ";"
+
+
+def info_cache_key(master, mode):
+    return (master.host, master.port, master.database, mode)
+
+
+def build_database_info(rows, mode, cache_age=0.0, cached=False):
+    info = {table: {} for table in INFO_TABLES}
+    for row in rows or []:
+        row = dict(row)
+        info[row.pop('table_name')] = row
+    info["meta"] = {"mode": mode, "cached": cached, "cache_age": round(cache_age, 3)}
+    return info
@@ -0,0 +1,58 @@
+"""
+INSERT statements with an optional ON CONFLICT clause on each table's natural key,
+so ingestion jobs can be replayed without read-before-write.
+
+on_conflict modes:
+- error:  plain INSERT; a duplicate natural key is an error (the default).
+- ignore: keep the existing row untouched and return its id.
+- update: overwrite the existing row's other columns and return its id.
+"""
+
+CONFLICT_MODES = ("error", "ignore", "update")
+
+# The UNIQUE constraint (migration 0001) that identifies a row of each table.
+NATURAL_KEYS = {
+    "humans": ("name", "birthplace", "birthday"),
+    "documents": ("related_human_id", "identifier_type", "source"),
+    "families": ("related_human_id", "relation_type", "human_name"),
+}
+
+
+def conflict_clause(table, columns, on_conflict):
+    if on_conflict == "error":
+        return ""
+    keys = NATURAL_KEYS[table]
+    if on_conflict == "ignore":
+        return f" ON CONFLICT ({', '.join(keys)}) DO NOTHING"
+    updates = [column for column in columns if column not in keys] or list(keys[:1])
+    set_clause = ", ".join(f"{column} = EXCLUDED.{column}" for column in updates)
+    return f" ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {set_clause}"
+
+
+def batch_insert_query(table, columns, on_conflict="error"):
+    """
+    Multi-row INSERT for execute_values, returning (id, inserted) per row written.
+    In ignore mode conflicting rows return nothing, so a short result means the
+    batch has to be replayed row by row.
+    """
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+            f"{conflict_clause(table, columns, on_conflict)} "
+            f"RETURNING id, (xmax = 0) AS inserted;")
+
+
+def row_insert_query(table, columns, on_conflict="error"):
+    """
+    Single-row INSERT taking named parameters, returning (id, inserted) in every mode:
+    in ignore mode the existing row's id is selected in the same statement.
+    xmax is 0 only for a row this statement inserted, not for one it updated.
+    """
+    values = ", ".join(f"%({column})s" for column in columns)
+    insert = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({values})"
+              f"{conflict_clause(table, columns, on_conflict)}")
+    if on_conflict != "ignore":
+        return f"{insert} RETURNING id, (xmax = 0) AS inserted;"
+    # The statement's snapshot can't see the row it inserts, so at most one branch returns.
+    match = " AND ".join(f"{key} = %({key})s" for key in NATURAL_KEYS[table])
+    return (f"WITH ins AS ({insert} RETURNING id) "
+            f"SELECT id, true AS inserted FROM ins "
+            f"UNION ALL SELECT id, false AS inserted FROM {table} WHERE {match};")
@@ -1,10 +1,58 @@
-from fastapi import FastAPI, HTTPException, Query
+import os
+import psycopg2
+from anyio import from_thread
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from session_manager import create_session, get_session, close_session
-from app import PostgresUser, create_new_database, populate_database_with_schema
-from typing import Type, Dict, Optional
+from starlette.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from responses import FastJSONResponse, make_etag, etag_matches, etag_headers, not_modified
+from session_manager import (create_session, get_session, close_session, close_pools, pool_stats,
+                             session_stats, start_reaper, stop_reaper, get_async_master,
+                             close_async_pools)
+from app import PostgresUser, AsyncPostgresUser, create_new_database, populate_database_with_schema
+from app import ENTITY_TABLES, CONFLICT_MODES, RESULT_FORMATS, run_migrations, migration_status, InvalidCursor
+from app import FUZZY_COLUMNS, DEFAULT_SIMILAR_THRESHOLD, DEFAULT_DUPLICATE_THRESHOLD
+from app import schema_cache, CopyImportError, IMPORT_FORMATS, EXPORT_FORMATS, INFO_MODES, entity_cache, info_cache
+from typing import Type, Dict, List, Optional
 
-app = FastAPI()
+# Database engine, chosen at startup: "sync" runs psycopg2 in the threadpool,
+# "async" runs psycopg 3 natively on the event loop.
+ASYNC_ENGINE = os.environ.get("DB_ENGINE", "sync") == "async"
+
+# Responses are rendered with orjson when it is installed. Handlers returning large
+# row sets return FastJSONResponse themselves, which skips FastAPI's generic
+# jsonable_encoder walk over every value.
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# Responses of at least COMPRESSION_MIN_SIZE bytes are compressed: brotli when the
+# client accepts it and brotli-asgi is installed, gzip otherwise.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1000"))
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+@app.on_event("startup")
+def startup_reaper():
+    start_reaper()
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    stop_reaper()
+    close_pools()
+    await close_async_pools()
+
+async def call_user(master, method, *args, **kwargs):
+    """
+    Run a PostgresUser method on the configured engine: natively on the async engine
+    when it implements the method, otherwise on the sync engine in the threadpool.
+    """
+    if ASYNC_ENGINE and hasattr(AsyncPostgresUser, method):
+        async_master = await get_async_master(master)
+        return await getattr(AsyncPostgresUser(async_master), method)(*args, **kwargs)
+    return await run_in_threadpool(getattr(PostgresUser(master), method), *args, **kwargs)
 
 # Database configuration model.
 class DBConfig(BaseModel):
@@ -61,6 +109,12 @@ class FamilyUpdate(BaseModel):
     human_id: Optional[int] = None
     comments: Optional[str] = None
 
+class IdList(BaseModel):
+    ids: List[int]
+
+# Upper bound on ids resolved by one multi-get request.
+MAX_MULTI_GET_IDS = 10000
+
 # Map entity names to their models
 models_config: Dict[str, Dict[str, Type[BaseModel]]] = {
     "human": {"create": HumanCreate, "update": HumanUpdate},
@@ -68,54 +122,244 @@ models_config: Dict[str, Dict[str, Type[BaseModel]]] = {
     "family": {"create": FamilyCreate, "update": FamilyUpdate}
 }
 
+def parse_ids(raw: str) -> List[int]:
+    """
+    Parse a comma-separated id list ("1,2,3"), dropping duplicates but keeping order.
+    """
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers.")
+    return list(dict.fromkeys(ids))
+
+def check_result_format(format: str):
+    if format not in RESULT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(RESULT_FORMATS)}.")
+
+async def read_many_entities(master, entity_name: str, ids: List[int], format: str = "rows"):
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise HTTPException(status_code=400, detail="No ids provided.")
+    if len(ids) > MAX_MULTI_GET_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MULTI_GET_IDS} ids per request.")
+    check_result_format(format)
+    if format == "columnar":
+        result = await call_user(master, "read_many_columnar", ENTITY_TABLES[entity_name], ids)
+        id_index = result["columns"].index("id")
+        found = {row[id_index] for row in result["rows"]}
+        result["missing"] = [entity_id for entity_id in ids if entity_id not in found]
+        return FastJSONResponse(result)
+    found = await call_user(master, "read_many", ENTITY_TABLES[entity_name], ids)
+    return FastJSONResponse({
+        "items": {str(entity_id): found[entity_id] for entity_id in ids if entity_id in found},
+        "missing": [entity_id for entity_id in ids if entity_id not in found]
+    })
+
+def check_conflict_mode(on_conflict: str):
+    if on_conflict not in CONFLICT_MODES:
+        raise HTTPException(status_code=400,
+                            detail=f"on_conflict must be one of {', '.join(CONFLICT_MODES)}.")
+
 def create_crud_routes(entity_name: str, create_model: Type[BaseModel], update_model: Type[BaseModel]):
     base_url = f"/{entity_name}/session"
+    # Payload models hold flat fields only, so vars() reads the validated values
+    # directly instead of re-dumping every model with .dict().
 
     @app.post(f"{base_url}", status_code=201)
-    def create_entity(session_id: str, payload: create_model):
+    async def create_entity(session_id: str, payload: create_model, response: Response,
+                            on_conflict: str = "error"):
+        """
+        on_conflict=ignore|update turns a duplicate natural key into a no-op or an
+        overwrite; either way the row's id is returned (201 if created, 200 if not).
+        """
+        master = get_session(session_id)
+        if not master:
+            raise HTTPException(status_code=404, detail="Session not found.")
+        check_conflict_mode(on_conflict)
+        if on_conflict == "error":
+            entity_id = await call_user(master, f"create_{entity_name}", **vars(payload))
+            return {f"{entity_name}_id": entity_id}
+        result = await call_user(master, "upsert", ENTITY_TABLES[entity_name], vars(payload), on_conflict)
+        if not result["created"]:
+            response.status_code = 200
+        return {f"{entity_name}_id": result["id"], "created": result["created"]}
+
+    @app.post(f"{base_url}/bulk", status_code=201)
+    async def bulk_create_entities(session_id: str, payload: List[create_model],
+                                   batch_size: int = Query(500, ge=1, le=5000),
+                                   on_conflict: str = "error"):
+        """
+        "existing" counts rows that matched a natural key under on_conflict=ignore|update.
+        """
+        master = get_session(session_id)
+        if not master:
+            raise HTTPException(status_code=404, detail="Session not found.")
+        check_conflict_mode(on_conflict)
+        result = await call_user(master, f"bulk_create_{entity_name}",
+                                 [vars(item) for item in payload], batch_size, on_conflict)
+        return {
+            f"{entity_name}_ids": result["ids"],
+            "inserted": result["inserted"],
+            "existing": len(payload) - result["inserted"] - len(result["errors"]),
+            "errors": result["errors"]
+        }
+
+    @app.get(f"{base_url}")
+    async def read_entities(session_id: str, ids: str, format: str = "rows"):
+        """
+        Fetch many entities in one query: ?ids=1,2,3. Results are keyed by id and
+        ids that don't exist are listed under "missing". format=columnar returns
+        "columns" plus one value array per row (ordered by id) instead of "items".
+        """
+        master = get_session(session_id)
+        if not master:
+            raise HTTPException(status_code=404, detail="Session not found.")
+        return await read_many_entities(master, entity_name, parse_ids(ids), format)
+
+    @app.post(f"{base_url}/multi")
+    async def read_entities_post(session_id: str, payload: IdList, format: str = "rows"):
+        """
+        Same as the GET multi-get, for id lists too long for a query string.
+        """
         master = get_session(session_id)
         if not master:
             raise HTTPException(status_code=404, detail="Session not found.")
-        user_interface = getattr(PostgresUser(master), f"create_{entity_name}")
-        entity_id = user_interface(**payload.dict())
-        return {f"{entity_name}_id": entity_id}
+        return await read_many_entities(master, entity_name, payload.ids, format)
 
     @app.get(f"{base_url}/{{entity_id}}")
-    def read_entity(session_id: str, entity_id: int):
+    async def read_entity(request: Request, session_id: str, entity_id: int):
+        """
+        Carries an ETag digesting the row; If-None-Match with it answers 304.
+        """
         master = get_session(session_id)
         if not master:
             raise HTTPException(status_code=404, detail="Session not found.")
-        user_interface = getattr(PostgresUser(master), f"read_{entity_name}")
-        entity = user_interface(entity_id)
+        entity = await call_user(master, f"read_{entity_name}", entity_id)
         if not entity:
             raise HTTPException(status_code=404, detail=f"{entity_name.capitalize()} not found.")
-        return entity
+        etag = make_etag(entity_name, list(entity.items()))
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        return FastJSONResponse(entity, headers=etag_headers(etag))
 
     @app.put(f"{base_url}/{{entity_id}}")
-    def update_entity(session_id: str, entity_id: int, payload: update_model):
+    async def update_entity(session_id: str, entity_id: int, payload: update_model):
         master = get_session(session_id)
         if not master:
             raise HTTPException(status_code=404, detail="Session not found.")
-        update_data = {k: v for k, v in payload.dict().items() if v is not None}
+        update_data = {k: v for k, v in vars(payload).items() if v is not None}
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields provided for update.")
-        user_interface = getattr(PostgresUser(master), f"update_{entity_name}")
-        user_interface(entity_id, **update_data)
+        await call_user(master, f"update_{entity_name}", entity_id, **update_data)
         return {"message": f"{entity_name.capitalize()} updated successfully"}
 
     @app.delete(f"{base_url}/{{entity_id}}")
-    def delete_entity(session_id: str, entity_id: int):
+    async def delete_entity(session_id: str, entity_id: int):
         master = get_session(session_id)
         if not master:
             raise HTTPException(status_code=404, detail="Session not found.")
-        user_interface = getattr(PostgresUser(master), f"delete_{entity_name}")
-        user_interface(entity_id)
+        await call_user(master, f"delete_{entity_name}", entity_id)
         return {"message": f"{entity_name.capitalize()} deleted successfully"}
 
+# Fixed-path human routes are registered before the CRUD routes so that
+# /human/session/{entity_id} doesn't capture them.
+@app.get("/human/session/search")
+async def search_humans(session_id: str, q: str, limit: int = Query(20, ge=1, le=500),
+                        cursor: Optional[str] = None):
+    """
+    Ranked full-text search over human names, biographies and comments.
+    q accepts web-search syntax ("quoted phrases", -excluded, or). Pass next_cursor
+    back as cursor for the next page.
+    """
+    master = get_session(session_id)
+    if not master:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q must not be empty.")
+    try:
+        return FastJSONResponse(await call_user(master, "search_humans", q, limit, cursor))
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def create_similar_route(entity_name: str):
+    table = ENTITY_TABLES[entity_name]
+
+    @app.get(f"/{entity_name}/session/similar")
+    async def find_similar(session_id: str, name: str,
+                           threshold: float = Query(DEFAULT_SIMILAR_THRESHOLD, gt=0, le=1),
+                           limit: int = Query(20, ge=1, le=500)):
+        """
+        Rows whose name (families: human_name) is trigram-similar to name, best match first.
+        """
+        master = get_session(session_id)
+        if not master:
+            raise HTTPException(status_code=404, detail="Session not found.")
+        if not name.strip():
+            raise HTTPException(status_code=400, detail="name must not be empty.")
+        return FastJSONResponse({"results": await call_user(master, "find_similar", table, name, threshold, limit)})
+
+for entity, table in ENTITY_TABLES.items():
+    if table in FUZZY_COLUMNS:
+        create_similar_route(entity)
+
+@app.get("/human/session/duplicates")
+async def find_duplicate_humans(session_id: str,
+                                threshold: float = Query(DEFAULT_DUPLICATE_THRESHOLD, ge=0.3, le=1),
+                                limit: int = Query(50, ge=1, le=1000)):
+    """
+    Clusters of humans with similar names (likely spelling variants of one person),
+    ranked by their closest pair. Matching runs in the database on the trigram index.
+    """
+    master = get_session(session_id)
+    if not master:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    return FastJSONResponse(await call_user(master, "find_duplicate_humans", threshold, limit))
+
 # Dynamically create CRUD routes for each model
 for entity, models in models_config.items():
     create_crud_routes(entity, models["create"], models["update"])
 
+@app.get("/human/session/{human_id}/profile")
+async def read_human_profile(session_id: str, human_id: int,
+                             documents_limit: Optional[int] = Query(None, ge=0),
+                             families_limit: Optional[int] = Query(None, ge=0)):
+    """
+    A human with their documents and family edges in one query. The optional limits
+    cap each child list; documents_total/families_total give the full counts.
+    """
+    master = get_session(session_id)
+    if not master:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    profile = await call_user(master, "read_human_profile", human_id, documents_limit, families_limit)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Human not found.")
+    return FastJSONResponse(profile)
+
+# Deepest family-graph walk a single request may ask for.
+MAX_GRAPH_DEPTH = 6
+
+@app.get("/human/session/{human_id}/relatives")
+async def read_family_graph(session_id: str, human_id: int,
+                            max_depth: int = Query(3, ge=1, le=MAX_GRAPH_DEPTH),
+                            relation_types: Optional[str] = None,
+                            direction: str = "both",
+                            target_id: Optional[int] = None):
+    """
+    Nodes and edges of the family graph within max_depth hops of a human, in one query.
+    relation_types is a comma-separated filter (e.g. Father,Mother); direction is
+    out, in or both; target_id adds a shortest path to that human.
+    """
+    master = get_session(session_id)
+    if not master:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    if direction not in ("out", "in", "both"):
+        raise HTTPException(status_code=400, detail="direction must be one of out, in, both.")
+    types = [t.strip() for t in relation_types.split(",") if t.strip()] if relation_types else None
+    graph = await call_user(master, "get_family_graph", human_id, max_depth, types, direction, target_id)
+    if not graph or not graph["nodes"] or not graph["nodes"][0]["exists"]:
+        raise HTTPException(status_code=404, detail="Human not found.")
+    return FastJSONResponse(graph)
+
 # Session endpoints
 @app.post("/session")
 def create_db_session(db_config: DBConfig):
@@ -133,21 +377,41 @@ def close_db_session(session_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/session/stats")
+def get_session_stats():
+    """
+    Session occupancy and eviction counters, the shared connection pools and the
+    hit/miss/eviction counters of the in-process caches.
+    """
+    return {
+        "sessions": session_stats(),
+        "pools": pool_stats(),
+        "caches": {"entities": entity_cache.stats(), "database_info": info_cache.stats()}
+    }
+
 
 # Database info endpoint: Return summary statistics for humans, documents, and families.
 @app.get("/database-info")
-def get_database_info(session_id: str):
+async def get_database_info(request: Request, session_id: str, mode: str = "exact"):
+    """
+    mode=exact counts rows; mode=estimate answers from planner statistics.
+    The ETag is weak: it covers the counts and id ranges but not "meta".
+    """
     master = get_session(session_id)
     if not master:
         raise HTTPException(status_code=404, detail="Session not found.")
+    if mode not in INFO_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'.")
     try:
-        user_interface = PostgresUser(master)
-        info = user_interface.get_database_info()
-        return info
+        info = await call_user(master, "get_database_info", mode)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    etag = make_etag("database-info", mode, [(table, list(info[table].items())) for table in info if table != "meta"], weak=True)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return FastJSONResponse(info, headers=etag_headers(etag))
 
-        # Endpoint to create a new database and populate it with the schema from init.sql.
+        # Endpoint to create a new database and populate it with the schema migrations.
 @app.post("/database/create")
 def create_and_populate_database(session_id: str, new_database: str):
     master = get_session(session_id)
@@ -166,7 +430,7 @@ def create_and_populate_database(session_id: str, new_database: str):
              'database': new_database
          }
          
-         # Populate the new database with the schema from init.sql.
+         # Bring the new database up to date by applying every schema migration.
          schema_message = populate_database_with_schema(new_db_config)
          
          return {"message": f"{creation_message} {schema_message}"}
@@ -174,10 +438,44 @@ def create_and_populate_database(session_id: str, new_database: str):
          raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/database/migrations")
+def get_migrations(session_id: str):
+    """
+    Known schema migrations and whether each is applied to the session's database.
+    """
+    master = get_session(session_id)
+    if not master:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    try:
+        return {"migrations": migration_status(master)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/database/migrate")
+def migrate_database(session_id: str, target: Optional[int] = None):
+    """
+    Apply pending schema migrations (up to `target`) to the session's database.
+    """
+    master = get_session(session_id)
+    if not master:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    try:
+        return {"applied": run_migrations(master, target=target)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/session/bundle")
-def get_bundle(session_id: str, table_name: str, offset: int = 0, limit: int = 100):
+async def get_bundle(request: Request, session_id: str, table_name: str, offset: int = 0, limit: int = 100,
+                     pagination: str = "offset", cursor: Optional[str] = None, format: str = "rows"):
     """
     Fetch paginated data from the specified table.
+    pagination=cursor switches to keyset paging: pass each response's next_cursor
+    back as `cursor` to get the following page. A cursor implies cursor mode.
+    format=columnar sends the column names once plus one value array per row.
+    Pages carry an ETag built from the (key, xmin) of their rows, read by the page
+    query itself. Only a request with If-None-Match costs a separate (cheap) version
+    query, which answers 304 without fetching or serializing the page.
     """
     try:
         # ✅ Get active session
@@ -185,17 +483,32 @@ def get_bundle(session_id: str, table_name: str, offset: int = 0, limit: int = 1
         if not master:
             raise HTTPException(status_code=404, detail="Session not found.")
 
-        # ✅ Initialize PostgresUser for DB operations
-        user_interface = PostgresUser(master)
+        # ✅ Dynamically fetch bundle using PostgresUser on the configured engine
+        check_result_format(format)
+        if cursor:
+            pagination = "cursor"
+        def bundle_etag(version):
+            return make_etag("bundle", table_name, offset, limit, cursor, pagination, format,
+                             schema_cache.generation, version)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            # None for a missing table or unreadable cursor: no ETag, get_bundle reports it.
+            version = await call_user(master, "get_bundle_version", table_name=table_name, offset=offset,
+                                      limit=limit, cursor=cursor, pagination=pagination)
+            if version is not None and etag_matches(if_none_match, bundle_etag(version)):
+                return not_modified(bundle_etag(version))
 
-        # ✅ Dynamically fetch bundle using PostgresUser
-        bundle = user_interface.get_bundle(table_name=table_name, offset=offset, limit=limit)
+        bundle = await call_user(master, "get_bundle", table_name=table_name, offset=offset, limit=limit,
+                                 cursor=cursor, pagination=pagination, format=format, versioned=True)
 
         # ✅ If no data found or table doesn't exist
         if not bundle:
             raise HTTPException(status_code=404, detail=f"No data found for table '{table_name}'.")
 
-        return {"bundle": bundle}
+        version = bundle.pop("version", None)
+        headers = etag_headers(bundle_etag(version)) if version is not None else None
+        return FastJSONResponse({"bundle": bundle}, headers=headers)
 
     except HTTPException as http_err:
         raise http_err
@@ -203,6 +516,67 @@ def get_bundle(session_id: str, table_name: str, offset: int = 0, limit: int = 1
         print("❌ Error in get_bundle:", str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/session/import")
+async def import_table(request: Request, session_id: str, table_name: str, format: str = "csv"):
+    """
+    Stream a CSV or NDJSON request body into a table with COPY. Columns are mapped by
+    the CSV header (or the first NDJSON object's keys); the body is never buffered whole.
+    Bad rows don't fail the import: "rejected" counts malformed rows, rows with a value
+    the table refuses ("invalid") and existing rows ("conflicts"), with sample lines.
+    """
+    master = get_session(session_id)
+    if not master:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'.")
+
+    body = request.stream()
+
+    async def next_chunk():
+        try:
+            return await body.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def chunks():
+        # Runs in the COPY worker thread and pulls each chunk from the event loop on demand.
+        while True:
+            chunk = from_thread.run(next_chunk)
+            if chunk is None:
+                return
+            if chunk:
+                yield chunk
+
+    try:
+        return await run_in_threadpool(PostgresUser(master).import_stream, table_name, format, chunks())
+    except CopyImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=400, detail=(e.pgerror or str(e)).strip())
+    except Exception as e:
+        print("❌ Error in import_table:", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/session/export")
+async def export_table(session_id: str, table_name: str, format: str = "ndjson",
+                       chunk_size: int = Query(2000, ge=1, le=50000)):
+    """
+    Stream a whole table as NDJSON or CSV, read through a server-side cursor.
+    """
+    master = get_session(session_id)
+    if not master:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'.")
+    rows = await run_in_threadpool(PostgresUser(master).export_table, table_name, format, chunk_size)
+    if rows is None:
+        raise HTTPException(status_code=404, detail=f"Table '{table_name}' does not exist.")
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.{format}"'}
+    )
+
 # Run the app
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,73 @@
+# responses.py
+import datetime
+import decimal
+import hashlib
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; responses fall back to the stdlib encoder.
+    orjson = None
+
+
+def _default(value):
+    # Types orjson doesn't serialize natively but psycopg2 can return; encoded the
+    # way FastAPI's jsonable_encoder encodes them.
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).decode()
+    return jsonable_encoder(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, which serializes dicts, lists and the
+    date/datetime values psycopg returns natively. Handlers that return one
+    directly also skip FastAPI's jsonable_encoder pass over the content.
+    """
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(jsonable_encoder(content))
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def make_etag(*parts, weak=False):
+    """
+    Quoted entity tag digesting parts (their repr). Weak tags (W/"...") are for
+    bodies that can differ in inessential fields between equivalent answers.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    If-None-Match comparison (weak comparison, as RFC 9110 prescribes for it).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def etag_headers(etag):
+    # no-cache lets clients store the body but makes them revalidate it every time.
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(etag):
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -1,12 +1,116 @@
 # session_manager.py
+import asyncio
+import os
+import time
 import uuid
-from threading import Lock
-from app import PostgresMaster  # Import your context manager
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+from app import PostgresMaster, ConnectionPool  # Import your context manager
+from app import AsyncPostgresMaster, create_async_pool
 
-# Global dictionary to store active sessions.
-active_sessions = {}
+# Pooling configuration. With pooling on, sessions that share a DBConfig share one
+# bounded pool and each execute checks a connection out and back in. With pooling
+# off, every session opens its own dedicated connection (the original behaviour).
+POOLING_ENABLED   = os.environ.get("DB_POOLING", "1") not in ("0", "false", "False")
+POOL_SIZE         = int(os.environ.get("DB_POOL_SIZE", "5"))
+POOL_MIN_IDLE     = int(os.environ.get("DB_POOL_MIN_IDLE", "1"))
+POOL_MAX_OVERFLOW = int(os.environ.get("DB_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT      = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+# Session lifetime. Sessions idle longer than SESSION_IDLE_TTL seconds are closed by
+# the reaper; once SESSION_MAX sessions are open the least recently used is evicted.
+SESSION_IDLE_TTL      = float(os.environ.get("SESSION_IDLE_TTL", "1800"))
+SESSION_MAX           = int(os.environ.get("SESSION_MAX", "1000"))
+SESSION_REAP_INTERVAL = float(os.environ.get("SESSION_REAP_INTERVAL", "60"))
+
+# Global dictionary to store active sessions, ordered from least to most recently used.
+active_sessions = OrderedDict()
+session_last_used = {}
+session_counters = {"created": 0, "closed": 0, "evicted_idle": 0, "evicted_lru": 0}
 session_lock = Lock()
 
+_reaper_stop = Event()
+_reaper_thread = None
+
+# Connection pools keyed by PostgresMaster.key, shared across sessions. pool_refs
+# counts the open sessions per key; a key's pools are closed with its last session.
+pools = {}
+async_pools = {}
+async_pool_loops = {}
+pool_refs = {}
+pool_lock = Lock()
+_closing_tasks = set()
+
+def get_pool(master):
+    """
+    Return the shared pool for the master's configuration, creating it on first use.
+    """
+    with pool_lock:
+        pool = pools.get(master.key)
+        if pool is None:
+            pool = ConnectionPool(
+                master.connect,
+                size=POOL_SIZE,
+                min_idle=POOL_MIN_IDLE,
+                max_overflow=POOL_MAX_OVERFLOW,
+                timeout=POOL_TIMEOUT
+            )
+            pools[master.key] = pool
+        return pool
+
+async def get_async_master(master):
+    """
+    Return an AsyncPostgresMaster for the session's database. Sessions with the same
+    configuration share one asyncio pool, sized like the sync pools.
+    """
+    with pool_lock:
+        pool = async_pools.get(master.key)
+        if pool is None:
+            pool = create_async_pool(
+                master.host,
+                master.port,
+                master.user,
+                master.password,
+                master.database,
+                min_size=POOL_MIN_IDLE,
+                max_size=POOL_SIZE + POOL_MAX_OVERFLOW,
+                timeout=POOL_TIMEOUT
+            )
+            async_pools[master.key] = pool
+            async_pool_loops[master.key] = asyncio.get_running_loop()
+    await pool.open()
+    return AsyncPostgresMaster(master.host, master.port, master.user, master.password,
+                               master.database, pool)
+
+def close_pools():
+    """
+    Close every shared pool (used on application shutdown).
+    """
+    with pool_lock:
+        closing = list(pools.values())
+        pools.clear()
+    for pool in closing:
+        pool.closeall()
+
+async def close_async_pools():
+    """
+    Close every shared asyncio pool (used on application shutdown).
+    """
+    with pool_lock:
+        closing = list(async_pools.values())
+        async_pools.clear()
+        async_pool_loops.clear()
+    for pool in closing:
+        await pool.close()
+
+def pool_stats():
+    """
+    Occupancy of every shared pool, keyed by database name.
+    """
+    with pool_lock:
+        return [dict(pool.stats(), host=key[0], port=key[1], database=key[4])
+                for key, pool in pools.items()]
+
 def create_session(db_config):
     """
     Create a persistent DB session by instantiating PostgresMaster and manually entering its context.
@@ -19,25 +123,173 @@ def create_session(db_config):
         db_config.password,
         db_config.database
     )
-    # Manually open the connection (bypassing 'with' so it stays open).
-    master.__enter__()
+    with pool_lock:
+        pool_refs[master.key] = pool_refs.get(master.key, 0) + 1
+    try:
+        if POOLING_ENABLED:
+            master.pool = get_pool(master)
+        # Manually open the connection (bypassing 'with' so it stays open).
+        master.__enter__()
+    except Exception:
+        _release_pools([master])
+        raise
+    evicted = []
     with session_lock:
+        while SESSION_MAX > 0 and len(active_sessions) >= SESSION_MAX:
+            evicted.append(_pop_session(next(iter(active_sessions))))
+            session_counters["evicted_lru"] += 1
         active_sessions[session_id] = master
+        session_last_used[session_id] = time.monotonic()
+        session_counters["created"] += 1
+    _close_masters(evicted)
     return session_id
 
 def get_session(session_id):
     """
-    Retrieve an active session by its session_id.
+    Retrieve an active session by its session_id and mark it as recently used.
+    Sessions that have been idle past the TTL are closed instead of returned.
     """
+    now = time.monotonic()
+    expired = None
     with session_lock:
-        return active_sessions.get(session_id)
+        master = active_sessions.get(session_id)
+        if master is None:
+            return None
+        if _is_expired(session_id, now):
+            expired = _pop_session(session_id)
+            session_counters["evicted_idle"] += 1
+        else:
+            active_sessions.move_to_end(session_id)
+            session_last_used[session_id] = now
+    if expired is not None:
+        _close_masters([expired])
+        return None
+    return master
 
 def close_session(session_id):
     """
     Close and remove a session.
     """
     with session_lock:
-        master = active_sessions.pop(session_id, None)
+        master = _pop_session(session_id)
+        if master:
+            session_counters["closed"] += 1
     if master:
-        master.__exit__(None, None, None)
+        try:
+            master.__exit__(None, None, None)
+        finally:
+            _release_pools([master])
+
+def reap_sessions():
+    """
+    Close every session that has been idle longer than SESSION_IDLE_TTL.
+    Returns the number of sessions evicted.
+    """
+    now = time.monotonic()
+    expired = []
+    with session_lock:
+        # Sessions are kept in LRU order, so the idle ones are all at the front.
+        for session_id in list(active_sessions):
+            if not _is_expired(session_id, now):
+                break
+            expired.append(_pop_session(session_id))
+        session_counters["evicted_idle"] += len(expired)
+    _close_masters(expired)
+    return len(expired)
+
+def start_reaper():
+    """
+    Start the background thread that reaps idle sessions every SESSION_REAP_INTERVAL seconds.
+    """
+    global _reaper_thread
+    if _reaper_thread is not None and _reaper_thread.is_alive():
+        return
+    _reaper_stop.clear()
+    _reaper_thread = Thread(target=_reap_forever, name="session-reaper", daemon=True)
+    _reaper_thread.start()
+
+def stop_reaper():
+    """
+    Stop the reaper thread and wait for it to exit.
+    """
+    global _reaper_thread
+    _reaper_stop.set()
+    if _reaper_thread is not None:
+        _reaper_thread.join()
+        _reaper_thread = None
+
+def session_stats():
+    """
+    Session occupancy, eviction counters and the configured limits.
+    """
+    now = time.monotonic()
+    with session_lock:
+        oldest = min(session_last_used.values(), default=None)
+        return dict(
+            session_counters,
+            active=len(active_sessions),
+            max_sessions=SESSION_MAX,
+            idle_ttl=SESSION_IDLE_TTL,
+            oldest_idle_seconds=round(now - oldest, 3) if oldest is not None else None
+        )
+
+def _reap_forever():
+    while not _reaper_stop.wait(SESSION_REAP_INTERVAL):
+        try:
+            reap_sessions()
+        except Exception as e:
+            print("❌ Error reaping sessions:", str(e))
+
+def _is_expired(session_id, now):
+    return SESSION_IDLE_TTL > 0 and now - session_last_used[session_id] > SESSION_IDLE_TTL
+
+def _pop_session(session_id):
+    # Caller holds session_lock.
+    session_last_used.pop(session_id, None)
+    return active_sessions.pop(session_id, None)
+
+def _close_masters(masters):
+    for master in masters:
+        try:
+            master.__exit__(None, None, None)
+        except Exception as e:
+            print("❌ Error closing evicted session:", str(e))
+    _release_pools(masters)
+
+def _release_pools(masters):
+    """
+    Drop each master's reference to its pool key and close the sync and asyncio pools
+    of keys that no session uses any more. Pooled masters hold no connection of their
+    own, so this is what actually frees a reaped or evicted session's connections.
+    """
+    closing = []
+    closing_async = []
+    with pool_lock:
+        for master in masters:
+            refs = pool_refs.get(master.key, 0) - 1
+            if refs > 0:
+                pool_refs[master.key] = refs
+                continue
+            pool_refs.pop(master.key, None)
+            if master.key in pools:
+                closing.append(pools.pop(master.key))
+            if master.key in async_pools:
+                closing_async.append((async_pools.pop(master.key), async_pool_loops.pop(master.key)))
+    for pool in closing:
+        pool.closeall()
+    for pool, loop in closing_async:
+        _close_async_pool(pool, loop)
 
+def _close_async_pool(pool, loop):
+    # Asyncio pools must be closed on the loop that opened them; the reaper and the
+    # sync routes run in other threads.
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        task = loop.create_task(pool.close())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+    elif not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop)
@@ -0,0 +1,94 @@
+"""
+FAMILY_GRAPH_QUERY against a live Postgres. Point TEST_DATABASE_URL at any database
+(a libpq DSN such as "host=localhost user=admin password=password dbname=postgres");
+the tests work on temporary humans/families tables that shadow the real ones, so
+nothing is written to the database. Run from server/:
+
+    TEST_DATABASE_URL="host=localhost user=admin dbname=postgres" python -m pytest tests
+"""
+import itertools
+import os
+
+import psycopg2
+import pytest
+
+from app.queries import FAMILY_GRAPH_QUERY, FAMILY_GRAPH_WALK
+
+DSN = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture
+def cur():
+    conn = psycopg2.connect(DSN)
+    try:
+        with conn.cursor() as cur:
+            # Temporary tables live in pg_temp, which is searched first.
+            cur.execute("CREATE TEMP TABLE humans (id integer PRIMARY KEY, name text);")
+            cur.execute("CREATE TEMP TABLE families (id serial PRIMARY KEY, related_human_id integer, "
+                        "relation_type text, human_name text, human_id integer);")
+            yield cur
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def add_humans(cur, ids):
+    for human_id in ids:
+        cur.execute("INSERT INTO humans VALUES (%s, %s);", (human_id, f"Human {human_id}"))
+
+
+def link(cur, source, target, relation_type):
+    cur.execute("INSERT INTO families (related_human_id, relation_type, human_name, human_id) "
+                "VALUES (%s, %s, %s, %s);", (source, relation_type, f"Human {target}", target))
+
+
+def params(human_id, max_depth, direction="both", target_id=None):
+    return {
+        "human_id": human_id,
+        "max_depth": max_depth,
+        "relation_types": None,
+        "directions": ["out", "in"] if direction == "both" else [direction],
+        "target_id": target_id,
+    }
+
+
+def test_reciprocal_clique_walks_one_row_per_depth(cur):
+    # Seven relatives who all list each other, twice over (e.g. Father/Son plus a
+    # second relation): a walk over simple paths would produce tens of thousands of rows.
+    members = range(1, 8)
+    add_humans(cur, members)
+    for source, target in itertools.permutations(members, 2):
+        link(cur, source, target, "Relative")
+        link(cur, source, target, "Kin")
+
+    cur.execute(FAMILY_GRAPH_WALK + " SELECT COUNT(*) FROM walk;", params(1, 6))
+    assert cur.fetchone()[0] == 2
+    cur.execute(FAMILY_GRAPH_WALK + " SELECT COUNT(*), COUNT(DISTINCT node) FROM reached;", params(1, 6))
+    assert cur.fetchone() == (7, 7)
+
+    cur.execute(FAMILY_GRAPH_QUERY, params(1, 6, target_id=7))
+    nodes, edges, path = cur.fetchone()
+    assert [(node["id"], node["depth"]) for node in nodes] == [(1, 0)] + [(n, 1) for n in range(2, 8)]
+    assert len(edges) == 2 * 7 * 6
+    assert path == [1, 7]
+
+
+def test_chain_respects_depth_and_direction(cur):
+    add_humans(cur, range(1, 6))
+    for source in range(1, 5):
+        link(cur, source, source + 1, "Child")
+
+    cur.execute(FAMILY_GRAPH_QUERY, params(1, 2, direction="out", target_id=3))
+    nodes, edges, path = cur.fetchone()
+    assert [(node["id"], node["depth"]) for node in nodes] == [(1, 0), (2, 1), (3, 2)]
+    assert path == [1, 2, 3]
+
+    cur.execute(FAMILY_GRAPH_QUERY, params(1, 4, direction="in", target_id=5))
+    nodes, edges, path = cur.fetchone()
+    assert [node["id"] for node in nodes] == [1]
+    assert path is None
+
+    cur.execute(FAMILY_GRAPH_QUERY, params(5, 4, direction="in", target_id=1))
+    assert cur.fetchone()[2] == [5, 4, 3, 2, 1]
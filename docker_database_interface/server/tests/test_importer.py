@@ -0,0 +1,103 @@
+"""
+copy_import against a live Postgres, on temporary humans/families tables (see
+test_family_graph.py for TEST_DATABASE_URL). Nothing is written to the database.
+"""
+import json
+import os
+
+import psycopg2.extensions
+import pytest
+
+from app import PostgresMaster, importer
+from app.importer import copy_import
+
+DSN = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL is not set")
+
+HUMAN_COLUMNS = {
+    "id": "integer", "name": "character varying(255)", "birthday": "date",
+    "birthplace": "character varying(255)", "gender": "character varying(255)",
+    "culture": "character varying(255)",
+}
+FAMILY_COLUMNS = {
+    "id": "integer", "related_human_id": "integer", "relation_type": "character varying(50)",
+    "human_name": "character varying(255)",
+}
+
+
+@pytest.fixture
+def master():
+    dsn = psycopg2.extensions.parse_dsn(DSN)
+    master = PostgresMaster(dsn.get("host", "localhost"), int(dsn.get("port", 5432)), dsn.get("user"),
+                            dsn.get("password"), dsn.get("dbname"))
+    master.__enter__()
+    try:
+        # The dedicated connection keeps these temporary tables for the whole test.
+        master.execute("CREATE TEMP TABLE humans (id SERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+                       "birthday DATE NOT NULL, birthplace VARCHAR(255) NOT NULL, gender VARCHAR(255) NOT NULL, "
+                       "culture VARCHAR(255) NOT NULL, UNIQUE (name, birthplace, birthday));")
+        master.execute("CREATE TEMP TABLE families (id SERIAL PRIMARY KEY, "
+                       "related_human_id INTEGER REFERENCES humans(id) NOT NULL, "
+                       "relation_type VARCHAR(50) NOT NULL, human_name VARCHAR(255) NOT NULL);")
+        yield master
+    finally:
+        master.__exit__(None, None, None)
+
+
+def chunked(text, size=7):
+    data = text.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+HUMANS_CSV = (
+    "name,birthday,birthplace,gender,culture\n"
+    "Ada,1815-12-10,London,female,English\n"
+    "Bad Date,not-a-date,Paris,male,French\n"
+    "Short Row,1900-01-01\n"
+    f"Too Long,1900-01-01,{'x' * 300},male,French\n"
+    "Ada,1815-12-10,London,female,English\n"
+    "Grace,1906-12-09,New York,female,American\n"
+)
+
+
+@pytest.mark.parametrize("batch_size", [2, importer.IMPORT_BATCH_SIZE])
+def test_bad_values_reject_only_their_rows(master, monkeypatch, batch_size):
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", batch_size)
+    result = copy_import(master, "humans", "csv", chunked(HUMANS_CSV), HUMAN_COLUMNS)
+
+    assert result["rows_read"] == 5
+    assert result["inserted"] == 2
+    assert result["rejected"]["malformed"] == 1
+    assert result["rejected"]["invalid"] == 2
+    assert result["rejected"]["conflicts"] == 1
+    samples = {sample["line"]: sample["error"] for sample in result["rejected"]["samples"]}
+    assert sorted(samples) == [3, 4, 5]
+    assert "invalid input syntax for type date" in samples[3]
+    assert "too long" in samples[5]
+    assert [row["name"] for row in master.execute("SELECT name FROM humans ORDER BY id;")] == ["Ada", "Grace"]
+
+
+def test_foreign_key_violation_in_ndjson(master):
+    human_id = master.execute("INSERT INTO humans (name, birthday, birthplace, gender, culture) "
+                              "VALUES ('Ada', '1815-12-10', 'London', 'female', 'English') RETURNING id;")[0]["id"]
+    lines = [
+        {"related_human_id": human_id, "relation_type": "Father", "human_name": "George"},
+        {"related_human_id": human_id + 1000, "relation_type": "Father", "human_name": "Nobody"},
+        {"related_human_id": human_id, "relation_type": "Mother", "human_name": "Anne"},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n"
+    result = copy_import(master, "families", "ndjson", chunked(body), FAMILY_COLUMNS)
+
+    assert result["inserted"] == 2
+    assert result["rejected"]["invalid"] == 1
+    assert result["rejected"]["samples"][0]["line"] == 2
+    assert "foreign key" in result["rejected"]["samples"][0]["error"]
+
+
+def test_explicit_ids_move_the_sequence(master):
+    body = "id,name,birthday,birthplace,gender,culture\n40,Ada,1815-12-10,London,female,English\n"
+    assert copy_import(master, "humans", "csv", chunked(body), HUMAN_COLUMNS)["inserted"] == 1
+    new_id = master.execute("INSERT INTO humans (name, birthday, birthplace, gender, culture) "
+                            "VALUES ('Grace', '1906-12-09', 'New York', 'female', 'American') RETURNING id;")
+    assert new_id[0]["id"] == 41
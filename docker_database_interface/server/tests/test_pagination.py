@@ -0,0 +1,126 @@
+"""
+Cursor tokens, bundle page queries and page versions (app.pagination); no database needed.
+"""
+import base64
+import hashlib
+
+import pytest
+
+from app.pagination import (ROW_KEY, ROW_VERSION, InvalidCursor, bundle_query, bundle_version_query,
+                            decode_cursor, encode_cursor, next_cursor, search_position, split_page_version)
+
+
+def raw_token(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("position", [{"id": 42}, {"id": 0}, {"rank": 0.25, "id": 7}, {"name": "Ünïcode ✓"}])
+def test_cursor_round_trip(position):
+    token = encode_cursor(position)
+    assert "=" not in token
+    assert decode_cursor(token) == position
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not base64 at all!",
+    "é",
+    raw_token("not json"),
+    raw_token("[1, 2]"),
+    raw_token("42"),
+    raw_token("null"),
+    base64.urlsafe_b64encode(b"\xff\xfe{").decode(),
+])
+def test_garbage_cursors_are_invalid(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+def test_offset_page_orders_by_key_when_there_is_one():
+    assert bundle_query("humans", "id", offset=200, limit=50) == \
+        ("SELECT * FROM humans ORDER BY id OFFSET %s LIMIT %s;", (200, 50))
+    # Composite or missing primary key: offset paging still works, unordered.
+    assert bundle_query("links", None, offset=10, limit=5) == ("SELECT * FROM links OFFSET %s LIMIT %s;", (10, 5))
+
+
+def test_cursor_pages_resume_after_the_last_key():
+    assert bundle_query("humans", "id", limit=3, pagination="cursor") == \
+        ("SELECT * FROM humans ORDER BY id LIMIT %s;", (3,))
+    query, params = bundle_query("humans", "id", limit=3, cursor=encode_cursor({"id": 9}), pagination="cursor")
+    assert query == "SELECT * FROM humans WHERE id > %s ORDER BY id LIMIT %s;"
+    assert params == (9, 3)
+
+
+@pytest.mark.parametrize("primary_key, cursor, pagination", [
+    (None, None, "cursor"),                           # composite key: nothing to page by
+    ("id", encode_cursor({"other": 1}), "cursor"),    # token for a different key
+    ("id", encode_cursor({"id": None}), "cursor"),
+    ("id", "garbage!", "cursor"),
+    ("id", None, "sideways"),
+])
+def test_unusable_cursor_requests(primary_key, cursor, pagination):
+    with pytest.raises(InvalidCursor):
+        bundle_query("humans", primary_key, cursor=cursor, pagination=pagination)
+
+
+def test_tampered_cursor_value_is_passed_as_a_parameter():
+    # A value of the wrong type is never interpolated; the database rejects it.
+    query, params = bundle_query("humans", "id", cursor=encode_cursor({"id": "1; DROP TABLE humans"}),
+                                 pagination="cursor")
+    assert "DROP" not in query
+    assert params == ("1; DROP TABLE humans", 100)
+
+
+def test_next_cursor_for_dict_and_columnar_rows():
+    rows = [{"id": 1}, {"id": 2}, {"id": 5}]
+    assert decode_cursor(next_cursor(rows, 3)) == {"id": 5}
+    columns = ["name", "id"]
+    assert decode_cursor(next_cursor([("a", 1), ("b", 8)], 2, "id", columns)) == {"id": 8}
+
+
+@pytest.mark.parametrize("rows, limit", [([], 10), ([{"id": 1}], 10), ([{"id": 1}, {"id": 2}], 3)])
+def test_short_page_is_the_last_page(rows, limit):
+    assert next_cursor(rows, limit) is None
+
+
+def digest(*pairs):
+    return hashlib.md5(",".join(pairs).encode()).hexdigest()
+
+
+def test_split_page_version_strips_dict_rows():
+    rows = [{"id": 1, "name": "a", ROW_KEY: "1", ROW_VERSION: "700"},
+            {"id": 2, "name": "b", ROW_KEY: "2", ROW_VERSION: "701"}]
+    stripped, columns, version = split_page_version(rows)
+    assert stripped == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+    assert columns is None
+    assert version == digest("1:700", "2:701")
+
+
+def test_split_page_version_strips_columnar_rows():
+    columns = ["id", "name", ROW_KEY, ROW_VERSION]
+    rows, columns, version = split_page_version([(1, "a", "1", "700"), (2, "b", "2", "701")], columns)
+    assert rows == [(1, "a"), (2, "b")]
+    assert columns == ["id", "name"]
+    assert version == digest("1:700", "2:701")
+
+
+def test_empty_page_version_matches_the_version_query():
+    # The version query digests COALESCE(string_agg(...), '') for an empty page.
+    assert split_page_version([])[2] == split_page_version([], [ROW_KEY, ROW_VERSION])[2] == digest()
+
+
+def test_version_query_wraps_the_same_page():
+    query, params = bundle_version_query("humans", "id", limit=3, cursor=encode_cursor({"id": 9}),
+                                         pagination="cursor")
+    assert params == (9, 3)
+    assert f"id::text AS {ROW_KEY}, xmin::text AS {ROW_VERSION} FROM humans WHERE id > %s" in query
+    # Without a single-column key, rows are identified by ctid.
+    assert f"ctid::text AS {ROW_KEY}" in bundle_version_query("links", None)[0]
+
+
+def test_search_position():
+    assert search_position(None) == (None, None)
+    assert search_position(encode_cursor({"rank": 0.5, "id": 3})) == (0.5, 3)
+    for position in ({"rank": "high", "id": 3}, {"rank": 0.5, "id": "3"}, {"rank": 0.5}):
+        with pytest.raises(InvalidCursor):
+            search_position(encode_cursor(position))
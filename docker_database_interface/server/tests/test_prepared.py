@@ -0,0 +1,66 @@
+"""
+The per-connection prepared statement cache, driven through a fake cursor so no
+database is needed.
+"""
+from collections import OrderedDict
+
+import pytest
+
+from app import prepared
+from app.prepared import StatementCacheConnection
+
+
+class FakeCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+
+
+@pytest.fixture
+def conn():
+    # __new__ skips psycopg2's connect; only the statement cache state is needed.
+    conn = StatementCacheConnection.__new__(StatementCacheConnection)
+    conn.statements = OrderedDict()
+    conn.statement_generation = None
+    conn._statement_counter = 0
+    return conn
+
+
+def test_lru_deallocates_the_evicted_statement_by_name(conn, monkeypatch):
+    monkeypatch.setattr(prepared, "PREPARED_CACHE_SIZE", 2)
+    cur = FakeCursor()
+    queries = [f"SELECT * FROM humans WHERE id = %s AND {n} = {n};" for n in range(3)]
+
+    for query in queries[:2]:
+        conn.execute_prepared(cur, query, (1,), generation=0)
+    conn.execute_prepared(cur, queries[0], (1,), generation=0)  # stmt_1 is now the most recent
+    cur.executed.clear()
+    conn.execute_prepared(cur, queries[2], (1,), generation=0)
+
+    assert cur.executed == [
+        "PREPARE stmt_3 AS SELECT * FROM humans WHERE id = $1 AND 2 = 2;",
+        "DEALLOCATE stmt_2;",
+        "EXECUTE stmt_3 (%s);",
+    ]
+    assert [name for name, _ in conn.statements.values()] == ["stmt_1", "stmt_3"]
+
+
+def test_cache_stays_bounded_past_its_size(conn, monkeypatch):
+    monkeypatch.setattr(prepared, "PREPARED_CACHE_SIZE", 4)
+    cur = FakeCursor()
+    for n in range(10):
+        conn.execute_prepared(cur, f"SELECT {n} WHERE %(x)s;", {"x": True}, generation=0)
+
+    deallocated = [query for query in cur.executed if query.startswith("DEALLOCATE")]
+    assert deallocated == [f"DEALLOCATE stmt_{n};" for n in range(1, 7)]
+    assert len(conn.statements) == 4
+
+
+def test_schema_generation_change_deallocates_everything(conn):
+    cur = FakeCursor()
+    conn.execute_prepared(cur, "SELECT 1;", None, generation=0)
+    cur.executed.clear()
+    conn.execute_prepared(cur, "SELECT 1;", None, generation=1)
+    assert cur.executed == ["DEALLOCATE ALL;", "PREPARE stmt_2 AS SELECT 1;", "EXECUTE stmt_2;"]
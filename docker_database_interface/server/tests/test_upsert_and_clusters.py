@@ -0,0 +1,85 @@
+"""
+ON CONFLICT SQL built by app.upsert and duplicate clustering in app.fuzzy; no database needed.
+"""
+import pytest
+
+from app.fuzzy import cluster_pairs
+from app.upsert import NATURAL_KEYS, batch_insert_query, conflict_clause, row_insert_query
+
+HUMAN_COLUMNS = ("name", "birthday", "birthplace", "gender", "culture")
+
+
+def test_error_mode_has_no_conflict_clause():
+    assert conflict_clause("humans", HUMAN_COLUMNS, "error") == ""
+    assert row_insert_query("documents", ("related_human_id", "identifier_type", "source")) == (
+        "INSERT INTO documents (related_human_id, identifier_type, source) "
+        "VALUES (%(related_human_id)s, %(identifier_type)s, %(source)s) RETURNING id, (xmax = 0) AS inserted;"
+    )
+
+
+def test_ignore_mode_targets_the_natural_key():
+    assert conflict_clause("humans", HUMAN_COLUMNS, "ignore") == \
+        " ON CONFLICT (name, birthplace, birthday) DO NOTHING"
+    assert batch_insert_query("families", ("related_human_id", "relation_type", "human_name"), "ignore") == (
+        "INSERT INTO families (related_human_id, relation_type, human_name) VALUES %s"
+        " ON CONFLICT (related_human_id, relation_type, human_name) DO NOTHING"
+        " RETURNING id, (xmax = 0) AS inserted;"
+    )
+
+
+def test_ignore_mode_row_query_returns_the_existing_id():
+    query = row_insert_query("humans", HUMAN_COLUMNS, "ignore")
+    assert query.startswith("WITH ins AS (INSERT INTO humans (name, birthday, birthplace, gender, culture) "
+                            "VALUES (%(name)s, %(birthday)s, %(birthplace)s, %(gender)s, %(culture)s) "
+                            "ON CONFLICT (name, birthplace, birthday) DO NOTHING RETURNING id) ")
+    assert query.endswith("SELECT id, true AS inserted FROM ins UNION ALL SELECT id, false AS inserted "
+                          "FROM humans WHERE name = %(name)s AND birthplace = %(birthplace)s "
+                          "AND birthday = %(birthday)s;")
+
+
+def test_update_mode_overwrites_only_non_key_columns():
+    assert conflict_clause("humans", HUMAN_COLUMNS, "update") == (
+        " ON CONFLICT (name, birthplace, birthday) DO UPDATE SET "
+        "gender = EXCLUDED.gender, culture = EXCLUDED.culture"
+    )
+    assert row_insert_query("humans", HUMAN_COLUMNS, "update").endswith(
+        "culture = EXCLUDED.culture RETURNING id, (xmax = 0) AS inserted;")
+
+
+def test_update_mode_with_only_key_columns_still_returns_the_row():
+    # DO NOTHING would return no row; a no-op SET makes RETURNING yield the existing id.
+    keys = NATURAL_KEYS["documents"]
+    assert conflict_clause("documents", keys, "update") == (
+        " ON CONFLICT (related_human_id, identifier_type, source) DO UPDATE SET "
+        "related_human_id = EXCLUDED.related_human_id"
+    )
+
+
+def pair(a, b, similarity):
+    return {"id": a, "candidate_id": b, "similarity": similarity}
+
+
+def test_pairs_cluster_transitively():
+    pairs = [pair(1, 2, 0.9), pair(4, 5, 0.7), pair(2, 3, 0.65), pair(6, 3, 0.61)]
+    clusters = cluster_pairs(pairs, limit=10)
+    assert [cluster["ids"] for cluster in clusters] == [[1, 2, 3, 6], [4, 5]]
+    assert [cluster["score"] for cluster in clusters] == [0.9, 0.7]
+    assert clusters[0]["pairs"] == [pair(1, 2, 0.9), pair(2, 3, 0.65), pair(6, 3, 0.61)]
+
+
+def test_clusters_joined_by_a_late_pair_merge():
+    # 1-2 and 3-4 start apart; 2-3 links them after both exist.
+    clusters = cluster_pairs([pair(1, 2, 0.8), pair(3, 4, 0.8), pair(2, 3, 0.6)], limit=10)
+    assert [cluster["ids"] for cluster in clusters] == [[1, 2, 3, 4]]
+
+
+@pytest.mark.parametrize("limit, expected", [(0, []), (1, [[7, 8, 9]]), (2, [[7, 8, 9], [1, 2]]),
+                                             (3, [[7, 8, 9], [1, 2], [3, 4]])])
+def test_limit_keeps_the_best_clusters(limit, expected):
+    # Equal scores rank by size, then by smallest id.
+    pairs = [pair(3, 4, 0.8), pair(1, 2, 0.8), pair(8, 9, 0.8), pair(7, 8, 0.7)]
+    assert [cluster["ids"] for cluster in cluster_pairs(pairs, limit)] == expected
+
+
+def test_no_pairs_no_clusters():
+    assert cluster_pairs([], limit=5) == []
@@ -1,3 +1,6 @@
+from collections import OrderedDict
+from threading import Lock
+
 import requests
 from flask import Flask, render_template, request, redirect, url_for, session, flash
 
@@ -14,6 +17,39 @@ DEFAULT_API_CONFIG = {
     "database": "default"
 }
 
+# Bodies of recent API GETs with their ETags. They are revalidated with If-None-Match,
+# so an unchanged page or listing comes back as an empty 304 and is served from here.
+ETAG_CACHE_SIZE = 256
+etag_cache = OrderedDict()
+etag_cache_lock = Lock()
+
+def conditional_get(url, params):
+    """
+    GET url and return (status_code, json body), reusing the cached body on 304.
+    """
+    key = (url, tuple(sorted(params.items())))
+    with etag_cache_lock:
+        cached = etag_cache.get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = requests.get(url, params=params, headers=headers)
+    print(f"GET {response.url} → {response.status_code}")
+
+    if response.status_code == 304 and cached:
+        with etag_cache_lock:
+            etag_cache[key] = cached
+            etag_cache.move_to_end(key)
+        return 200, cached[1]
+    if response.status_code != 200:
+        return response.status_code, None
+    body = response.json()
+    if response.headers.get("ETag"):
+        with etag_cache_lock:
+            etag_cache[key] = (response.headers["ETag"], body)
+            etag_cache.move_to_end(key)
+            while len(etag_cache) > ETAG_CACHE_SIZE:
+                etag_cache.popitem(last=False)
+    return 200, body
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "POST":
@@ -59,11 +95,11 @@ def list_tables():
     base_url = session["base_url"]
     sess_id = session["session_id"]
 
-    # Fetch tables and their info
-    response = requests.get(f"{base_url}/database-info", params={"session_id": sess_id})
+    # Fetch tables and their info (planner estimates are plenty for a listing page)
+    status, body = conditional_get(f"{base_url}/database-info", {"session_id": sess_id, "mode": "estimate"})
 
-    if response.status_code == 200:
-        db_info = response.json()
+    if status == 200:
+        db_info = {table: info for table, info in body.items() if table != "meta"}
         return render_template("tables.html", db_info=db_info)
     else:
         flash("Failed to fetch database info.")
@@ -78,25 +114,26 @@ def view_table(table_name):
     base_url = session["base_url"]
     sess_id = session["session_id"]
 
-    # Pagination setup
-    page = int(request.args.get("page", 0))
-    offset = page * 100
-
+    # Pagination setup: ?page=N keeps the old offset paging, otherwise walk the
+    # table with keyset cursors (?cursor=<next_cursor of the previous page>).
+    # Columnar pages name each column once instead of repeating it on every row.
     params = {
         "session_id": sess_id,
         "table_name": table_name,
-        "offset": offset,
-        "limit": 100
+        "limit": 100,
+        "format": "columnar"
     }
+    if "page" in request.args:
+        params["offset"] = int(request.args.get("page", 0)) * 100
+    else:
+        params["pagination"] = "cursor"
+        if request.args.get("cursor"):
+            params["cursor"] = request.args["cursor"]
 
-    response = requests.get(f"{base_url}/session/bundle", params=params)
-
-    # Log for debugging
-    print(f"GET {response.url} → {response.status_code}")
-    print("Response:", response.text)
+    status, body = conditional_get(f"{base_url}/session/bundle", params)
 
-    if response.status_code == 200:
-        table_data = response.json().get("bundle", [])
+    if status == 200:
+        table_data = body.get("bundle", [])
         return table_data
 
 if __name__ == "__main__":